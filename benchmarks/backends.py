@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Measure the per-call overhead of the execution backends for a trivial
+function.
+
+Backends not supported by the running Python fall back to subprocess, which is
+indicated in the output.
+
+Usage: python benchmarks/backends.py [--repetitions N]
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import textwrap
+import time
+
+MODULE = textwrap.dedent(
+    """
+    import veer
+
+
+    @veer.in_subprocess(backend="subprocess")
+    def subprocess(x):
+        return x + 1
+
+
+    @veer.in_subprocess(imports=[])
+    def slim(x):
+        return x + 1
+
+
+    @veer.in_subprocess(workers=1)
+    def workers(x):
+        return x + 1
+
+
+    @veer.in_subprocess(backend="subinterpreter")
+    def subinterpreter(x):
+        return x + 1
+
+
+    @veer.in_subprocess(backend="thread")
+    def thread(x):
+        return x + 1
+    """
+)
+
+
+def time_calls(func, repetitions):
+    func(0)  # warm up filesystem caches, workers and interpreters
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func(0)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="veer_bench_") as directory:
+        with open(os.path.join(directory, "veer_backends_module.py"), "w") as f:
+            f.write(MODULE)
+        sys.path.insert(0, directory)
+        module = importlib.import_module("veer_backends_module")
+
+        for name in ["subprocess", "slim", "workers", "subinterpreter", "thread"]:
+            veerified = getattr(module, name)
+            durations = time_calls(veerified, args.repetitions)
+
+            effective = veerified._backend
+            if veerified._workers is not None:
+                effective += " (workers)"
+            print(
+                f"{name:>14}: mean {1e3 * sum(durations) / len(durations):8.2f} ms, "
+                f"min {1e3 * min(durations):8.2f} ms "
+                f"[{effective}, {args.repetitions} calls]"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Measure the startup overhead of veer children when the module defining the
+veerified function has an expensive top-level.
+
+Usage: python benchmarks/child_startup.py [--repetitions N]
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import textwrap
+import time
+
+HEAVY_MODULE = textwrap.dedent(
+    '''
+    import email.mime.multipart
+    import http.client
+    import json
+    import xml.dom.minidom
+
+    import numpy as np
+    import veer
+
+    # stand-in for config loading and object construction at import time
+    LOOKUP_TABLE = np.random.default_rng(1234).random((1000, 1000))
+    INVERSE = np.linalg.inv(LOOKUP_TABLE)
+
+
+    @veer.in_subprocess
+    def full(x):
+        return x + 1
+
+
+    @veer.in_subprocess(imports=[])
+    def slim(x):
+        return x + 1
+    '''
+)
+
+
+def time_calls(func, repetitions):
+    func(0)  # warm up filesystem caches
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func(0)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repetitions", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="veer_bench_") as directory:
+        with open(os.path.join(directory, "veer_heavy_module.py"), "w") as f:
+            f.write(HEAVY_MODULE)
+        sys.path.insert(0, directory)
+        module = importlib.import_module("veer_heavy_module")
+
+        for name in ["full", "slim"]:
+            durations = time_calls(getattr(module, name), args.repetitions)
+            print(
+                f"{name:>5}: mean {1e3 * sum(durations) / len(durations):7.1f} ms, "
+                f"min {1e3 * min(durations):7.1f} ms "
+                f"({args.repetitions} calls)"
+            )
+
+
+if __name__ == "__main__":
+    main()
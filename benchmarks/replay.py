@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Replay captured call payloads (see `veer.capture`) through the veer
+transport between two local processes and report throughput, latency and
+memory.
+
+Each payload is sent via `util.send_object` to a receiver process, which
+deserializes it via `util.recv_object` and acknowledges it. The latency of a
+payload is the time until the acknowledgement is received. Once all payloads
+are sent, the sender shuts down its side of the connection (so that any
+payload, including None, can be replayed) and the receiver reports its peak
+memory usage.
+
+Usage: python benchmarks/replay.py CAPTURE_FILE [--serializer NAME]
+       [--kind arguments|result] [--function NAME] [--repetitions N]
+"""
+
+import argparse
+import collections
+import resource
+import socket as skt
+import subprocess as sp
+import sys
+import time
+
+from veer import capture, util
+
+
+def connect(port):
+    socket = skt.create_connection(("127.0.0.1", port))
+    socket.setsockopt(skt.IPPROTO_TCP, skt.TCP_NODELAY, 1)
+    return socket
+
+
+def get_max_rss():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(durations, q):
+    durations = sorted(durations)
+    return durations[min(len(durations) - 1, int(q * len(durations)))]
+
+
+def receive(port):
+    socket = connect(port)
+    while True:
+        try:
+            obj = util.recv_object(socket)
+        except RuntimeError:
+            # the sender shut down its side of the connection
+            break
+        del obj
+        util.send_object(socket, True, preferred="json")
+    # the sender cannot acknowledge anymore, send the raw number
+    socket.sendall(str(get_max_rss()).encode())
+    socket.close()
+
+
+def replay(payloads, serializer, repetitions):
+    listener = skt.socket(skt.AF_INET, skt.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    receiver = sp.Popen(
+        [sys.executable, __file__, "--receive", str(listener.getsockname()[1])]
+    )
+    socket, _ = listener.accept()
+    socket.setsockopt(skt.IPPROTO_TCP, skt.TCP_NODELAY, 1)
+
+    results = collections.defaultdict(lambda: {"bytes": 0, "durations": []})
+    for payload in payloads:
+        obj = payload.load()
+        preferred = serializer if serializer is not None else payload.serializer
+        result = results[payload.function, payload.kind]
+        for _ in range(repetitions):
+            stats = collections.Counter()
+            start = time.perf_counter()
+            util.send_object(socket, obj, preferred=preferred, stats=stats)
+            util.recv_object(socket)
+            result["durations"].append(time.perf_counter() - start)
+            result["bytes"] += stats["bytes_sent"]
+
+    socket.shutdown(skt.SHUT_WR)
+    receiver_rss = b""
+    while True:
+        data = socket.recv(4096)
+        if not data:
+            break
+        receiver_rss += data
+    receiver_rss = int(receiver_rss)
+    receiver.wait()
+    socket.close()
+    listener.close()
+    return results, receiver_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture_file", nargs="?")
+    parser.add_argument("--serializer", help="override the captured serializer")
+    parser.add_argument("--kind", choices=["arguments", "result"])
+    parser.add_argument("--function", help="only replay payloads of this function")
+    parser.add_argument("--repetitions", type=int, default=1)
+    parser.add_argument("--receive", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.receive is not None:
+        receive(args.receive)
+        return
+    if args.capture_file is None:
+        parser.error("the capture file is required")
+
+    payloads = [
+        payload
+        for payload in capture.read(args.capture_file)
+        if (args.kind is None or payload.kind == args.kind)
+        and (args.function is None or payload.function == args.function)
+    ]
+    if len(payloads) == 0:
+        print("No matching payloads.")
+        return
+
+    results, receiver_rss = replay(payloads, args.serializer, args.repetitions)
+
+    total_bytes = 0
+    total_duration = 0.0
+    for (function, kind), result in sorted(results.items()):
+        durations = result["durations"]
+        total_bytes += result["bytes"]
+        total_duration += sum(durations)
+        print(
+            f"{function} [{kind}]: {len(durations)} payloads, "
+            f"{result['bytes'] / len(durations) / 1e6:.3f} MB/payload, "
+            f"{result['bytes'] / sum(durations) / 1e6:8.1f} MB/s, "
+            f"latency mean {1e3 * sum(durations) / len(durations):.3f} ms, "
+            f"p50 {1e3 * percentile(durations, 0.5):.3f} ms, "
+            f"p99 {1e3 * percentile(durations, 0.99):.3f} ms"
+        )
+    print(
+        f"total: {total_bytes / 1e6:.1f} MB in {total_duration:.2f} s "
+        f"({total_bytes / total_duration / 1e6:.1f} MB/s), "
+        f"max RSS sender {get_max_rss() / (1 << 20):.1f} MiB, "
+        f"receiver {receiver_rss / (1 << 20):.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Measure how the time to launch a child grows with the resident set size of
+the host for each launch method.
+
+Usage: python benchmarks/spawn_vs_rss.py [--sizes-gib 0,1,2] [--repetitions N]
+"""
+
+import argparse
+import os
+import shutil
+import time
+
+from veer import launcher, util
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def allocate(nbytes):
+    buffer = bytearray(nbytes)
+    # touch every page so that it is actually resident
+    buffer[::PAGE_SIZE] = b"\1" * len(range(0, nbytes, PAGE_SIZE))
+    return buffer
+
+
+def time_launches(method, repetitions):
+    args = [shutil.which("true")]
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        process = launcher.launch(args, cwd="/", env={}, method=method)
+        durations.append(time.perf_counter() - start)
+        process.wait()
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes-gib", default="0,1,2")
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    buffers = []
+    allocated = 0
+    for size in sorted(float(size) for size in args.sizes_gib.split(",")):
+        nbytes = int(size * (1 << 30)) - allocated
+        if nbytes > 0:
+            buffers.append(allocate(nbytes))
+            allocated += nbytes
+
+        results = []
+        for method in launcher.METHODS:
+            durations = time_launches(method, args.repetitions)
+            results.append(
+                f"{method} mean {1e3 * sum(durations) / len(durations):7.2f} ms "
+                f"(min {1e3 * min(durations):6.2f} ms)"
+            )
+        print(f"RSS {util.get_rss() / (1 << 30):5.2f} GiB: " + ", ".join(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import sys
+import time
+import unittest
+import veer
+from veer import backends
+from veer.exception import RemoteError, RemoteTimeoutError
+
+
+@veer.in_subprocess(backend="thread")
+def get_pid_thread(values):
+    values.append(os.getpid())
+    return values
+
+
+@veer.in_subprocess(backend="subinterpreter")
+def get_pid_subinterpreter():
+    return os.getpid()
+
+
+@veer.in_subprocess(backend="subinterpreter")
+def run_subinterpreter(values, error=None):
+    from concurrent import interpreters
+
+    if error == "raise":
+        raise ValueError("Expected failure.")
+    if error == "exit":
+        # not caught by `execute_pickled`, so the call in the interpreter fails
+        sys.exit(1)
+    values.append(os.getpid())
+    return values, interpreters.get_current().id
+
+
+@veer.in_subprocess(backend="thread", timeout=0.5)
+def sleep_thread(duration):
+    time.sleep(duration)
+    if duration < 0:
+        raise ValueError("Expected failure.")
+
+
+class TestBackends(unittest.TestCase):
+    def test_fallback(self):
+        if not backends.supports_free_threading():
+            self.assertEqual(get_pid_thread._backend, "subprocess")
+        if not backends.supports_subinterpreters():
+            self.assertEqual(get_pid_subinterpreter._backend, "subprocess")
+            self.assertNotEqual(get_pid_subinterpreter(), os.getpid())
+
+    def test_thread(self):
+        # the thread backend can be exercised on any build, it just does not
+        # run in parallel with the GIL enabled
+        for veerified in [get_pid_thread, sleep_thread]:
+            veerified._backend = "thread"
+
+        values = []
+        self.assertEqual(get_pid_thread(values), [os.getpid()])
+        # arguments are passed as copies
+        self.assertEqual(values, [])
+
+        with self.assertRaises(RemoteError):
+            sleep_thread(-1)
+        with self.assertRaises(RemoteTimeoutError):
+            sleep_thread(2.0)
+        self.assertEqual(sleep_thread.get_stats()["timeouts"], 1)
+
+    @unittest.skipUnless(
+        backends.supports_subinterpreters(), "Subinterpreters not supported."
+    )
+    def test_subinterpreter(self):
+        from concurrent import interpreters
+
+        values = []
+        returned, interpreter_id = run_subinterpreter(values)
+        # executed in the host process, but in another interpreter
+        self.assertEqual(returned, [os.getpid()])
+        self.assertNotEqual(interpreter_id, interpreters.get_current().id)
+        # arguments are passed as copies
+        self.assertEqual(values, [])
+
+        # the interpreter is reused, also after the function raised
+        with self.assertRaises(RemoteError):
+            run_subinterpreter([], error="raise")
+        self.assertEqual(run_subinterpreter([])[1], interpreter_id)
+
+        # if the call itself failed, the interpreter is closed and replaced
+        with self.assertRaises(interpreters.ExecutionFailed):
+            run_subinterpreter([], error="exit")
+        ids = [interpreter.id for interpreter in interpreters.list_all()]
+        self.assertNotIn(interpreter_id, ids)
+        returned, replacement_id = run_subinterpreter([])
+        self.assertEqual(returned, [os.getpid()])
+        self.assertNotEqual(replacement_id, interpreter_id)
+
+        run_subinterpreter._interpreters.close()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import os.path as osp
+import tempfile
+import unittest
+import veer
+from veer import capture
+
+
+@veer.in_subprocess
+def concat(a, b=""):
+    return a + b
+
+
+class TestCapture(unittest.TestCase):
+    def setUp(self):
+        self.config = veer.get_config("capture")
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = osp.join(self.directory.name, "capture.bin")
+        veer.set_config("capture.file", self.path)
+
+    def tearDown(self):
+        veer.set_config("capture", self.config)
+        self.directory.cleanup()
+
+    def test_capture(self):
+        self.assertEqual(concat("a", b="b"), "ab")
+        self.assertEqual(concat("c"), "c")
+
+        payloads = list(capture.read(self.path))
+        self.assertEqual(
+            [payload.kind for payload in payloads],
+            ["arguments", "result", "arguments", "result"],
+        )
+        for payload in payloads:
+            self.assertEqual(payload.function, concat._qualified_name)
+            self.assertEqual(payload.nbytes, len(payload.data))
+        self.assertEqual(payloads[0].call_id, payloads[1].call_id)
+        self.assertEqual(payloads[0].load(), [["a"], {"b": "b"}])
+        self.assertEqual(payloads[3].load(), "c")
+
+    def test_separate_arguments(self):
+        try:
+            import numpy as np
+        except ImportError:
+            raise unittest.SkipTest("numpy module not found.")
+
+        # arrays are recorded as sent: separately via the numpy serializer
+        array = np.arange(3)
+        self.assertEqual(concat(array, b=array).tolist(), [0, 2, 4])
+        payloads = list(capture.read(self.path))
+        self.assertEqual(
+            [(payload.kind, payload.serializer) for payload in payloads],
+            [
+                ("arguments", "pickle"),
+                ("arguments", "numpy"),
+                ("arguments", "numpy"),
+                ("result", "numpy"),
+            ],
+        )
+        np.testing.assert_array_equal(payloads[1].load(), array)
+
+    def test_sampling(self):
+        veer.set_config("capture.sample_rate", 0.0)
+        concat("a")
+        self.assertEqual(list(capture.read(self.path)), [])
+
+    def test_size_cap(self):
+        veer.set_config("capture.max_bytes", 1 << 12)
+        for _ in range(5):
+            concat("x" * 1000)
+        self.assertLessEqual(os.path.getsize(self.path), 1 << 12)
+        self.assertEqual(len(list(capture.read(self.path))), 2)
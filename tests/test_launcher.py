@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import shutil
+import subprocess as sp
+import sys
+import unittest
+import veer
+from veer import launcher
+
+
+@veer.in_subprocess
+def get_cwd():
+    return os.getcwd()
+
+
+class TestLauncher(unittest.TestCase):
+    def setUp(self):
+        self.method = veer.get_config("launcher.method")
+
+    def tearDown(self):
+        veer.set_config("launcher.method", self.method)
+
+    def test_methods(self):
+        expected = os.path.dirname(os.path.abspath(__file__))
+        for method in launcher.METHODS:
+            veer.set_config("launcher.method", method)
+            self.assertEqual(get_cwd(), expected)
+
+        with self.assertRaises(ValueError):
+            launcher.get_launch_method("fork")
+
+    def test_spawned_process(self):
+        process = launcher.launch(
+            [shutil.which("sleep"), "10"], cwd=os.getcwd(), env={}, method="posix_spawn"
+        )
+        self.assertIsInstance(process, launcher.SpawnedProcess)
+        self.assertIsNone(process.poll())
+        with self.assertRaises(sp.TimeoutExpired):
+            process.wait(timeout=0.1)
+
+        # started in its own session
+        self.assertEqual(os.getpgid(process.pid), process.pid)
+        veer.util.kill_process_tree(process)
+        self.assertEqual(process.returncode, -9)
+
+        process = launcher.launch([shutil.which("false")], cwd="/", env={})
+        self.assertEqual(process.wait(), 1)
+
+    def test_inherited_fds(self):
+        read_fd, write_fd = os.pipe()
+        try:
+            os.set_inheritable(write_fd, True)
+            args = [sys.executable, "-c", f"import os; os.fstat({write_fd})"]
+            for method in launcher.METHODS:
+                process = launcher.launch(args, cwd=os.getcwd(), env={}, method=method)
+                # the descriptor is closed in the child, so fstat fails
+                self.assertEqual(process.wait(timeout=60), 1)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_cwd(self):
+        # processes that do not change to VEER_CWD themselves are started
+        # via popen, which sets the working directory
+        process = launcher.launch(
+            [shutil.which("true")], cwd="/", env={}, method="posix_spawn"
+        )
+        self.assertIsInstance(process, sp.Popen)
+        self.assertEqual(process.wait(), 0)
+
+        process = launcher.launch(
+            [shutil.which("true")],
+            cwd="/",
+            env={},
+            method="posix_spawn",
+            cwd_from_env=True,
+        )
+        self.assertIsInstance(process, launcher.SpawnedProcess)
+        self.assertEqual(process.wait(), 0)
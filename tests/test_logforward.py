@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import logging
+import os
+import time
+import unittest
+import veer
+
+log = logging.getLogger("veer_test_logforward")
+
+
+@veer.in_subprocess
+def chatty(num_records, duration=0.0):
+    log.debug("not forwarded")
+    log.info("started")
+    for i in range(num_records):
+        log.info(f"record {i}")
+    time.sleep(duration)
+    log.warning("finished")
+    return os.getpid()
+
+
+@veer.in_subprocess
+def chatty_verbose_logger():
+    verbose = logging.getLogger("veer_test_logforward.verbose")
+    verbose.setLevel(logging.DEBUG)
+    verbose.debug("not forwarded")
+    verbose.info("forwarded")
+
+
+@veer.in_subprocess(workers=1)
+def chatty_worker():
+    log.info("in worker")
+    return os.getpid()
+
+
+class _Collector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((time.monotonic(), record))
+
+
+class TestLogForward(unittest.TestCase):
+    def setUp(self):
+        self.config = veer.get_config("logging")
+        veer.set_config("logging.forward_level", "info")
+        veer.set_config("logging.flush_interval", 0.1)
+
+        self.collector = _Collector()
+        self.logger = logging.getLogger("veer.child")
+        self.logger.addHandler(self.collector)
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.collector)
+        self.logger.setLevel(logging.NOTSET)
+        veer.set_config("logging", self.config)
+
+    def get_messages(self):
+        return [record.getMessage() for _, record in self.collector.records]
+
+    def test_forwarding(self):
+        pid = chatty(3)
+        self.assertEqual(
+            self.get_messages(),
+            ["started", "record 0", "record 1", "record 2", "finished"],
+        )
+        for _, record in self.collector.records:
+            self.assertEqual(record.name, "veer.child.veer_test_logforward")
+            self.assertEqual(record.child_pid, pid)
+            self.assertEqual(record.process, pid)
+            self.assertIsNotNone(record.call_id)
+
+    def test_logger_levels(self):
+        # loggers with their own level do not bypass the forward level (which
+        # is applied in the child)
+        self.logger.setLevel(logging.DEBUG)
+        chatty_verbose_logger()
+        self.assertEqual(self.get_messages(), ["forwarded"])
+
+    def test_batches_during_call(self):
+        chatty(0, duration=1.0)
+        (received_started, _), (received_finished, _) = self.collector.records
+        # the first batch is sent while the function is still running
+        self.assertGreater(received_finished - received_started, 0.5)
+
+    def test_bounded_buffer(self):
+        veer.set_config("logging.buffer_size", 10)
+        with self.assertLogs("veer.logforward", level="WARNING") as cm:
+            chatty(1000)
+        self.assertIn("dropped", cm.output[0])
+        self.assertIn("finished", self.get_messages())
+
+    def test_workers(self):
+        self.addCleanup(chatty_worker._get_worker_pool().close)
+        pids = {chatty_worker() for _ in range(3)}
+        self.assertEqual(self.get_messages(), ["in worker"] * 3)
+        self.assertEqual({r.child_pid for _, r in self.collector.records}, pids)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import operator
+import os
+import unittest
+from unittest import mock
+import veer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@veer.in_subprocess
+def scale(chunk, factor=2):
+    return chunk * factor
+
+
+@veer.in_subprocess
+def column_sum(chunk):
+    return chunk.sum(axis=0)
+
+
+@veer.in_subprocess
+def column_max(chunk):
+    return chunk.max(axis=0)
+
+
+@veer.in_subprocess
+def describe(chunk):
+    return [(chunk.shape, os.getpid(), chunk.flags.writeable)]
+
+
+@veer.in_subprocess
+def field_a(chunk):
+    return chunk["a"]
+
+
+@veer.in_subprocess
+def positives(chunk):
+    return chunk[chunk > 0]
+
+
+@unittest.skipIf(np is None, "numpy not available")
+class TestMapArray(unittest.TestCase):
+    def test_concatenate(self):
+        array = np.arange(40, dtype=np.float64).reshape(10, 4)
+        result = scale.map_array(array, chunks=3, factor=3)
+        np.testing.assert_array_equal(result, array * 3)
+
+        result = scale.map_array(array, axis=1, chunks=4)
+        np.testing.assert_array_equal(result, array * 2)
+
+        out = np.zeros_like(array)
+        self.assertIs(scale.map_array(array, chunks=2, out=out), out)
+        np.testing.assert_array_equal(out, array * 2)
+
+    def test_chunks(self):
+        array = np.zeros((7, 3), dtype=np.int32)
+        descriptions = describe.map_array(array, chunks=3, reduce=operator.add)
+        self.assertEqual(len(descriptions), 3)
+        self.assertEqual(sorted(shape[0] for shape, *_ in descriptions), [2, 2, 3])
+        # one child per chunk, chunks are writeable (copy-on-write)
+        self.assertEqual(len({pid for _, pid, _ in descriptions}), 3)
+        self.assertTrue(all(writeable for *_, writeable in descriptions))
+
+        # more chunks than rows
+        np.testing.assert_array_equal(
+            scale.map_array(np.arange(2), chunks=5), np.arange(2) * 2
+        )
+
+    def test_reductions(self):
+        array = np.arange(30).reshape(10, 3)
+        np.testing.assert_array_equal(
+            column_sum.map_array(array, chunks=4, reduce="sum"), array.sum(axis=0)
+        )
+        self.assertEqual(
+            column_max.map_array(array, chunks=4, reduce=np.maximum).tolist(),
+            array.max(axis=0).tolist(),
+        )
+
+        # results of varying length are concatenated in order
+        array = np.array([-1, 2, 3, -4, 5, -6, 7])
+        np.testing.assert_array_equal(
+            positives.map_array(array, chunks=3), array[array > 0]
+        )
+        # ... even if the first chunk keeps all its rows
+        array = np.array([1, 2, 3, 4, -1, 5, -2, -3])
+        np.testing.assert_array_equal(
+            positives.map_array(array, chunks=2), array[array > 0]
+        )
+        with mock.patch.dict(os.environ, {"DEBUG": "1"}):
+            np.testing.assert_array_equal(
+                positives.map_array(array, chunks=2), array[array > 0]
+            )
+
+        with self.assertRaises(ValueError):
+            scale.map_array(array, reduce="max")
+
+    def test_structured(self):
+        records = np.zeros(10, dtype=[("a", np.int32), ("b", np.float64)])
+        records["a"] = np.arange(10)
+        np.testing.assert_array_equal(
+            field_a.map_array(records, chunks=3), np.arange(10)
+        )
+
+    def test_shared_file_removed(self):
+        before = set(os.listdir("/dev/shm"))
+        scale.map_array(np.ones((100, 100)), chunks=2)
+        self.assertEqual(set(os.listdir("/dev/shm")) - before, set())
+
+        # arrays of python objects are not mapped
+        objects = np.array([[1], "ab", (2,)], dtype=object)
+        self.assertEqual(
+            scale.map_array(objects, chunks=2).tolist(), [[1, 1], "abab", (2, 2)]
+        )
+        with self.assertRaises(OSError):
+            veer.scratch.MappedResult.dump(objects, directory="/dev/shm")
+        self.assertEqual(set(os.listdir("/dev/shm")) - before, set())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import os.path as osp
+import socket
+import tempfile
+import unittest
+import urllib.request
+import veer
+from veer import metrics
+from veer.exception import RemoteError
+
+
+@veer.in_subprocess
+def add_metrics(a, b):
+    return a + b
+
+
+@veer.in_subprocess
+def raise_metrics():
+    raise ValueError("Expected failure.")
+
+
+class TestMetrics(unittest.TestCase):
+    def test_registry(self):
+        registry = metrics.Registry()
+        counter = registry.counter("test_total", "Test counter.", ["name"])
+        gauge = registry.gauge("test_gauge", "Test gauge.")
+        histogram = registry.histogram("test_seconds", "Test.", buckets=[0.1, 1.0])
+
+        counter.inc(name="a")
+        counter.inc(2, name='b"')
+        gauge.inc(3)
+        gauge.dec()
+        for value in [0.05, 0.5, 5.0]:
+            histogram.observe(value)
+
+        self.assertIs(
+            registry.counter("test_total", "Test counter.", ["name"]), counter
+        )
+        with self.assertRaises(ValueError):
+            registry.gauge("test_total", "Test counter.")
+        with self.assertRaises(ValueError):
+            counter.inc(other="a")
+
+        snapshot = metrics.snapshot(registry)
+        self.assertEqual(snapshot["test_total"], {("a",): 1, ('b"',): 2})
+        self.assertEqual(snapshot["test_gauge"], {(): 2})
+        self.assertEqual(snapshot["test_seconds"][()]["count"], 3)
+        self.assertEqual(snapshot["test_seconds"][()]["buckets"][1.0], 2)
+
+        text = metrics.format_prometheus(registry)
+        self.assertIn("# TYPE test_total counter\n", text)
+        self.assertIn('test_total{name="b\\""} 2\n', text)
+        self.assertIn("test_gauge 2\n", text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3\n', text)
+        self.assertIn("test_seconds_sum 5.55\n", text)
+
+    def test_calls(self):
+        before = metrics.snapshot()
+        self.assertEqual(add_metrics(1, 2), 3)
+        with self.assertRaises(RemoteError):
+            raise_metrics()
+        after = metrics.snapshot()
+
+        def delta(name, *labels):
+            return after[name].get(labels, 0) - before[name].get(labels, 0)
+
+        name = add_metrics._qualified_name
+        self.assertEqual(delta("veer_calls_total", name, "success"), 1)
+        self.assertEqual(
+            delta("veer_calls_total", raise_metrics._qualified_name, "remote_error"), 1
+        )
+        self.assertEqual(delta("veer_children_spawned_total", name), 1)
+        self.assertEqual(after["veer_children_live"].get((), 0), 0)
+        self.assertGreater(delta("veer_bytes_sent_total"), 0)
+        self.assertEqual(after["veer_call_duration_seconds"][(name,)]["count"], 1)
+
+    def test_export(self):
+        add_metrics(1, 2)
+
+        server = metrics.start_http_server(0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                text = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn("veer_calls_total{", text)
+        self.assertIn("veer_queue_depth 0\n", text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = osp.join(directory, "veer.prom")
+            metrics.write_textfile(path)
+            with open(path) as f:
+                self.assertIn("veer_bytes_received_total", f.read())
+            self.assertEqual(os.listdir(directory), ["veer.prom"])
+
+    def test_autostart_port_in_use(self):
+        config = veer.get_config("metrics")
+        self.addCleanup(veer.set_config, "metrics", config)
+        self.addCleanup(setattr, metrics, "_autostarted", metrics._autostarted)
+
+        with socket.socket() as occupied:
+            occupied.bind(("", 0))
+            occupied.listen(1)
+            veer.set_config("metrics.http_port", occupied.getsockname()[1])
+            metrics._autostarted = False
+            with self.assertLogs("veer.metrics", level="WARNING"):
+                metrics.autostart()
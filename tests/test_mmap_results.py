@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import mmap
+import os
+import time
+import unittest
+import veer
+from veer.exception import RemoteTimeoutError
+
+
+@veer.in_subprocess(mmap_results=True)
+def get_large_bytes(size):
+    "Return a bytes-object of the given size."
+    return b"\x2a" * size
+
+
+@veer.in_subprocess(mmap_results=True)
+def get_large_array(shape):
+    "Return a numpy array with consecutive entries."
+    import numpy as np
+
+    return np.arange(np.prod(shape), dtype=np.float64).reshape(shape)
+
+
+@veer.in_subprocess(mmap_results=True)
+def get_large_records(size):
+    "Return a structured numpy array."
+    import numpy as np
+
+    records = np.zeros(size, dtype=[("a", np.int32), ("b", np.float64)])
+    records["a"] = np.arange(size)
+    return records
+
+
+@veer.in_subprocess(mmap_results=True, timeout=2.0)
+def write_and_hang(size):
+    "Write a result to the scratch directory but never send it."
+    veer.scratch.MappedResult.dump(b"\x2a" * size)
+    time.sleep(60)
+
+
+@veer.in_subprocess(mmap_results=True)
+def get_small_bytes():
+    return b"small"
+
+
+class TestMmapResults(unittest.TestCase):
+    def setUp(self):
+        self._files_before = set(os.listdir(veer.scratch.get_scratch_dir()))
+
+    def assertNoLeftoverFiles(self):
+        files_after = set(os.listdir(veer.scratch.get_scratch_dir()))
+        leftover = [
+            f for f in files_after - self._files_before if f.startswith("veer_result_")
+        ]
+        self.assertEqual(leftover, [])
+
+    def test_bytes(self):
+        size = veer.scratch.get_mmap_threshold() + 1
+        retval = get_large_bytes(size)
+
+        self.assertIsInstance(retval, mmap.mmap)
+        self.assertEqual(len(retval), size)
+        self.assertEqual(retval[:4], b"\x2a" * 4)
+        self.assertNoLeftoverFiles()
+
+    def test_array(self):
+        try:
+            import numpy as np
+        except ImportError:
+            raise unittest.SkipTest("numpy module not found.")
+
+        shape = (512, 1024)
+        retval = get_large_array(shape)
+
+        self.assertIsInstance(retval, np.memmap)
+        self.assertEqual(retval.shape, shape)
+        self.assertEqual(retval[3, 5], 3 * 1024 + 5)
+        self.assertNoLeftoverFiles()
+
+        # fields of structured arrays are preserved
+        retval = get_large_records(1 << 17)
+        self.assertIsInstance(retval, np.memmap)
+        self.assertEqual(retval.dtype.names, ("a", "b"))
+        self.assertEqual(retval["a"][7], 7)
+        self.assertNoLeftoverFiles()
+
+    def test_small_results_are_sent(self):
+        self.assertEqual(get_small_bytes(), b"small")
+
+    def test_killed_child(self):
+        with self.assertRaises(RemoteTimeoutError):
+            write_and_hang(veer.scratch.get_mmap_threshold())
+        self.assertNoLeftoverFiles()
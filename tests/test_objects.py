@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import hashlib
+import unittest
+import veer
+from veer import objects
+
+
+@veer.in_subprocess(workers=1)
+def checksum_persistent(table, offset):
+    return hashlib.md5(table).hexdigest(), offset
+
+
+@veer.in_subprocess
+def checksum(table):
+    return hashlib.md5(table).hexdigest()
+
+
+class TestObjects(unittest.TestCase):
+    def test_cache(self):
+        cache = objects.ObjectCache(capacity=3 << 20)
+        tables = [bytes([i]) * (1 << 20) for i in range(4)]
+
+        args, _, store, evict = cache.prepare((tables[0], 1), {})
+        self.assertIsInstance(args[0], objects.ObjectRef)
+        self.assertIsNone(args[0].obj)
+        self.assertEqual(args[1], 1)
+        self.assertEqual(list(store.values()), [tables[0]])
+
+        args, _, store, _ = cache.prepare((tables[0],), {"other": tables[1]})
+        self.assertEqual(list(store.values()), [tables[1]])
+
+        # tables[0] was used most recently
+        cache.prepare((tables[0],), {})
+        _, _, _, evict = cache.prepare((tables[2], tables[3]), {})
+        self.assertEqual(evict, [objects.get_ref(tables[1]).digest])
+        self.assertLessEqual(cache.size, cache.capacity)
+
+        # small arguments are sent as they are
+        args, _, store, _ = cache.prepare((b"small",), {})
+        self.assertEqual(args, (b"small",))
+
+    def test_pinned(self):
+        cache = objects.ObjectCache(capacity=2 << 20)
+        pinned = veer.put(b"\0" * (1 << 20))
+        cache.prepare((pinned,), {})
+
+        for i in range(1, 4):
+            _, _, _, evict = cache.prepare((bytes([i]) * (1 << 20),), {})
+            self.assertNotIn(pinned.digest, evict)
+        self.assertIn(pinned.digest, cache)
+
+    def test_calls(self):
+        table = veer.put(b"\1" * (4 << 20))
+        expected = hashlib.md5(table.obj).hexdigest()
+
+        for offset in range(3):
+            self.assertEqual(checksum_persistent(table, offset), (expected, offset))
+        stats = checksum_persistent.get_stats()
+        self.assertEqual(stats["object_misses"], 1)
+        self.assertEqual(stats["object_hits"], 2)
+        self.assertLess(stats["bytes_sent"], 2 * len(table.obj))
+
+        # children that do not keep objects receive the object itself
+        self.assertEqual(checksum(table), expected)
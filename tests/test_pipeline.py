@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import mmap
+import os
+import unittest
+from unittest import mock
+import veer
+from veer.exception import RemoteError
+
+
+@veer.in_subprocess
+def load(n):
+    return [os.getpid()] * n
+
+
+@veer.in_subprocess
+def append_pid(pids):
+    return pids + [os.getpid()]
+
+
+@veer.in_subprocess
+def fail(pids):
+    raise ValueError("Expected failure.")
+
+
+@veer.in_subprocess
+def repeat(pids):
+    return b"\x2a" * (len(pids) << 20)
+
+
+@veer.in_container(image="/nonexistent.sif")
+def in_other_container(pids):
+    return pids
+
+
+class TestPipeline(unittest.TestCase):
+    def test_single_child(self):
+        pids = veer.pipeline(load, append_pid, append_pid)(2)
+
+        self.assertEqual(len(pids), 4)
+        self.assertEqual(len(set(pids)), 1)
+        self.assertNotEqual(pids[0], os.getpid())
+
+    def test_branches(self):
+        left, right = veer.pipeline(load, (append_pid, append_pid))(1)
+
+        self.assertEqual(left[0], right[0])
+        self.assertNotEqual(left[1], right[1])
+        self.assertNotIn(left[0], [left[1], right[1]])
+
+        nested = veer.pipeline(
+            load, (veer.pipeline(append_pid, append_pid), append_pid)
+        )
+        left, right = nested(1)
+        self.assertEqual(len(left), 3)
+        self.assertEqual(left[1], left[2])
+
+    def test_options(self):
+        # options of the pipeline apply in the fused child
+        result = veer.pipeline(load, repeat, mmap_results=True)(2)
+        self.assertIsInstance(result, mmap.mmap)
+        self.assertEqual(len(result), 2 << 20)
+        result.close()
+
+    def test_object_refs(self):
+        pids = veer.pipeline(append_pid, append_pid)(veer.put([0]))
+        self.assertEqual(pids[0], 0)
+        self.assertEqual(len(pids), 3)
+
+    def test_container_binds(self):
+        veerified = veer.in_container(image=__file__)(append_pid._func)
+        veerified._extra_func_dirs = ["/stages", veerified._func_dir, "/stages"]
+        with mock.patch.object(veerified, "_get_container_binary"):
+            args = veerified._get_container_args("script.py")
+        self.assertEqual(
+            [args[i + 1] for i, arg in enumerate(args) if arg == "-B"],
+            [veerified._func_dir, "/stages"],
+        )
+
+    def test_errors(self):
+        with self.assertRaises(RemoteError):
+            veer.pipeline(load, fail, append_pid)(1)
+
+        with self.assertRaises(ValueError):
+            veer.pipeline(load, in_other_container)
+
+        with self.assertRaises(TypeError):
+            veer.pipeline(load, len)
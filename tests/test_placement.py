@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import unittest
+import veer
+from veer.placement import CpuAllocator, format_cpulist, parse_cpulist
+
+
+@veer.in_subprocess(cpus=1)
+def get_placement():
+    "Get affinity and thread settings of the child."
+    return os.sched_getaffinity(0), os.environ.get("OMP_NUM_THREADS", None)
+
+
+class TestPlacement(unittest.TestCase):
+    def test_cpulist(self):
+        cpus = parse_cpulist("0-3,8,10-11\n")
+        self.assertEqual(cpus, {0, 1, 2, 3, 8, 10, 11})
+        self.assertEqual(parse_cpulist(format_cpulist(cpus)), cpus)
+
+    def test_disjoint(self):
+        allocator = CpuAllocator(nodes=[set(range(4)), set(range(4, 8))])
+
+        first = allocator.allocate(2)
+        second = allocator.allocate(2)
+        third = allocator.allocate(4)
+
+        self.assertEqual(len(first & second), 0)
+        self.assertEqual(len((first | second) & third), 0)
+
+        # all allocations are confined to a single NUMA node
+        for cpus in [first, second, third]:
+            self.assertTrue(cpus <= set(range(4)) or cpus <= set(range(4, 8)))
+
+        allocator.release(third)
+        self.assertEqual(allocator.allocate(4), third)
+
+    def test_oversubscription(self):
+        allocator = CpuAllocator(nodes=[set(range(2))])
+
+        cpus = [allocator.allocate(1) for _ in range(4)]
+        self.assertEqual(allocator.get_usage(), {0: 2, 1: 2})
+        self.assertEqual(allocator.allocate(3), {0, 1})
+
+        for allocated in cpus:
+            allocator.release(allocated)
+        self.assertEqual(allocator.get_usage(), {0: 1, 1: 1})
+
+    def test_child_pinned(self):
+        affinity, omp_num_threads = get_placement()
+        self.assertEqual(len(affinity), 1)
+        self.assertTrue(affinity <= os.sched_getaffinity(0))
+        self.assertEqual(omp_num_threads, "1")
+
+    def test_invalid_cpus(self):
+        with self.assertRaises(ValueError):
+            veer.in_subprocess(cpus=0)(get_placement._func)
+
+        config = veer.get_config("placement.cpus_per_child")
+        self.addCleanup(veer.set_config, "placement.cpus_per_child", config)
+        veer.set_config("placement.cpus_per_child", 0)
+        with self.assertRaises(ValueError):
+            veer.in_subprocess(get_placement._func)()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import concurrent.futures as cf
+import threading
+import time
+import unittest
+import veer
+from veer.exception import RemoteTimeoutError
+from veer.scheduler import Scheduler
+
+
+@veer.in_subprocess
+def get_runtime(duration):
+    "Return start and stop time of the execution."
+    start = time.time()
+    time.sleep(duration)
+    return start, time.time()
+
+
+def wait_for_queued(scheduler, num):
+    while scheduler.get_stats()["queued"] < num:
+        time.sleep(0.01)
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self._config = veer.get_config("scheduler")
+        veer.set_config("scheduler.max_children", 1)
+
+    def tearDown(self):
+        veer.set_config("scheduler", self._config)
+
+    def test_priorities(self):
+        scheduler = Scheduler()
+        scheduler.acquire("blocker")
+
+        order = []
+
+        def acquire(name, priority):
+            scheduler.acquire(name, priority=priority)
+            order.append(name)
+            scheduler.release(name)
+
+        threads = []
+        for name, priority in [("low", "low"), ("normal", "normal"), ("high", "high")]:
+            threads.append(threading.Thread(target=acquire, args=(name, priority)))
+            threads[-1].start()
+            wait_for_queued(scheduler, len(threads))
+
+        scheduler.release("blocker")
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, ["high", "normal", "low"])
+        self.assertEqual(scheduler.get_stats()["waits"], 4)
+
+    def test_quota(self):
+        veer.set_config("scheduler.max_children", None)
+        scheduler = Scheduler()
+
+        scheduler.acquire("limited", quota=1)
+        with self.assertRaises(RemoteTimeoutError):
+            scheduler.acquire("limited", quota=1, timeout=0.1)
+
+        # other functions are not affected
+        with scheduler.slot("unlimited"):
+            self.assertEqual(scheduler.get_stats()["live"], 2)
+
+        scheduler.release("limited")
+        self.assertEqual(scheduler.get_stats()["live"], 0)
+
+    def test_global_cap(self):
+        veer.set_config("scheduler.max_children", 2)
+
+        with cf.ThreadPoolExecutor(max_workers=4) as executor:
+            runtimes = list(executor.map(get_runtime, [1.0] * 4))
+
+        for start, stop in runtimes:
+            overlapping = sum(s < stop and start < e for s, e in runtimes)
+            self.assertLessEqual(overlapping, 2)
+        self.assertGreater(get_runtime.get_stats()["queue_wait_seconds"], 0.0)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import unittest
+import veer
+from veer import serialization
+
+
+@veer.in_subprocess(serializer="msgpack")
+def msgpack_loopback(*args, **kwargs):
+    return {"args": list(args), "kwargs": kwargs}
+
+
+@veer.in_subprocess
+def get_array(shape):
+    import numpy as np
+
+    return np.arange(np.prod(shape), dtype=np.int32).reshape(shape)
+
+
+@veer.in_subprocess
+def get_sum(array, offset=None):
+    return float(array.sum() + (0 if offset is None else offset.sum()))
+
+
+def roundtrip(obj, preferred=None):
+    name, buffers = serialization.dumps(obj, preferred=preferred)
+    data = bytearray(b"".join(bytes(buffer) for buffer in buffers))
+    return name, serialization.loads(name, data)
+
+
+class TestSerialization(unittest.TestCase):
+    def test_negotiate(self):
+        own = {"pickle": 5, "numpy": 1, "msgpack": 1}
+        peer = serialization.parse_available("pickle=4,numpy=1")
+
+        self.assertEqual(serialization.negotiate(own, peer), {"pickle": 4, "numpy": 1})
+        self.assertEqual(
+            serialization.parse_available(serialization.format_available(own)), own
+        )
+
+    def test_fallback(self):
+        name, obj = roundtrip({1, 2, 3}, preferred="json")
+        self.assertEqual(name, "pickle")
+        self.assertEqual(obj, {1, 2, 3})
+
+        name, obj = roundtrip({"foo": [1, 2]}, preferred="json")
+        self.assertEqual(name, "json")
+        self.assertEqual(obj, {"foo": [1, 2]})
+
+        # payloads json would change are pickled
+        for payload in [{1: 2}, (1, 2), {"foo": (1,)}, bytearray(b"1")]:
+            name, obj = roundtrip(payload, preferred="json")
+            self.assertEqual(name, "pickle")
+            self.assertEqual(obj, payload)
+
+    def test_msgpack(self):
+        if "msgpack" not in serialization.get_available():
+            raise unittest.SkipTest("msgpack module not found.")
+
+        name, obj = roundtrip({"foo": [1, 2.0, b"bar"], 3: None}, preferred="msgpack")
+        self.assertEqual(name, "msgpack")
+        self.assertEqual(obj, {"foo": [1, 2.0, b"bar"], 3: None})
+
+        # payloads msgpack cannot encode or would change are pickled
+        for payload in [2**70, {(1, 2): 3}, [(1, 2)], [bytearray(b"1")]]:
+            name, obj = roundtrip(payload, preferred="msgpack")
+            self.assertEqual(name, "pickle")
+            self.assertEqual(obj, payload)
+
+        retval = msgpack_loopback(1, "two", three=[3])
+        self.assertEqual(retval, {"args": [1, "two"], "kwargs": {"three": [3]}})
+        stats = msgpack_loopback.get_stats()
+        self.assertEqual(stats["serializer_msgpack"], 1)
+        self.assertEqual(stats["received_serializer_msgpack"], 1)
+
+    def test_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            raise unittest.SkipTest("numpy module not found.")
+
+        array = np.arange(24, dtype=np.float64).reshape(4, 6)
+        for obj in [array, array[:, ::2], np.ones((), dtype=np.float32), array[:0]]:
+            name, loaded = roundtrip(obj)
+            self.assertEqual(name, "numpy")
+            self.assertEqual(loaded.dtype, obj.dtype)
+            self.assertTrue(np.array_equal(loaded, obj))
+            self.assertTrue(loaded.flags.writeable)
+            self.assertTrue(loaded.flags.aligned)
+
+        # arrays of python objects are pickled
+        name, _ = roundtrip(np.array([None, {}]))
+        self.assertEqual(name, "pickle")
+
+        retval = get_array((3, 4))
+        self.assertTrue(np.array_equal(retval, np.arange(12).reshape(3, 4)))
+        self.assertTrue(retval.flags.writeable)
+        self.assertEqual(get_array.get_stats()["received_serializer_numpy"], 1)
+
+        # numpy scalars stay numpy scalars
+        name, obj = roundtrip([np.float64(1.5)], preferred="json")
+        self.assertEqual(name, "pickle")
+        self.assertIs(type(obj[0]), np.float64)
+
+        # array arguments are sent with the numpy serializer
+        self.assertEqual(get_sum(array, offset=array), 2 * array.sum())
+        self.assertEqual(get_sum.get_stats()["serializer_numpy"], 2)
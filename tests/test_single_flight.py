@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import concurrent.futures as cf
+import os
+import time
+import unittest
+import veer
+from veer.exception import RemoteError
+
+
+@veer.in_subprocess(single_flight=True)
+def get_pid_deduplicated(duration):
+    time.sleep(duration)
+    return os.getpid()
+
+
+@veer.in_subprocess(single_flight=True)
+def raise_deduplicated(duration):
+    time.sleep(duration)
+    raise ValueError("Expected failure.")
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_deduplicate(self):
+        with cf.ThreadPoolExecutor(max_workers=4) as executor:
+            pids = list(executor.map(get_pid_deduplicated, [2.0] * 4))
+
+        self.assertEqual(len(set(pids)), 1)
+        stats = get_pid_deduplicated.get_stats()
+        self.assertEqual(stats["calls"], 1)
+        self.assertEqual(stats["single_flight_hits"], 3)
+
+        # finished calls are not reused
+        self.assertNotEqual(get_pid_deduplicated(0.0), pids[0])
+
+    def test_remote_error(self):
+        with cf.ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(raise_deduplicated, 2.0) for _ in range(2)]
+            errors = [future.exception() for future in futures]
+
+        self.assertIsInstance(errors[0], RemoteError)
+        self.assertIs(errors[0], errors[1])
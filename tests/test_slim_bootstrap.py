@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import unittest
+import veer
+
+
+@veer.in_subprocess(imports=["sys"])
+def module_imported_slim(module_name):
+    "Check whether the defining module was imported in the child."
+    return module_name in sys.modules  # noqa: F821
+
+
+@veer.in_subprocess
+def module_imported_full(module_name):
+    "Check whether the defining module was imported in the child."
+    import sys
+
+    return module_name in sys.modules
+
+
+@veer.in_subprocess(imports=["os.path as osp", "from os import getpid"])
+def slim_with_imports(filename):
+    return osp.basename(filename), getpid()  # noqa: F821
+
+
+@veer.in_subprocess(
+    imports=["sys"],
+    timeout=60,
+)
+def slim_multiline_decorator():
+    return "multiline"
+
+
+class TestSlimBootstrap(unittest.TestCase):
+    def test_module_not_imported(self):
+        self.assertFalse(module_imported_slim(__name__))
+        self.assertTrue(module_imported_full(__name__))
+
+    def test_imports(self):
+        basename, pid_child = slim_with_imports("/foo/bar.py")
+        self.assertEqual(basename, "bar.py")
+        self.assertNotEqual(pid_child, os.getpid())
+
+    def test_decorators_stripped(self):
+        source = slim_multiline_decorator._get_slim_source()
+        self.assertTrue(source.startswith("def slim_multiline_decorator():"))
+        self.assertEqual(slim_multiline_decorator(), "multiline")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import concurrent.futures as cf
+import os
+import os.path as osp
+import shutil
+import subprocess as sp
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import veer
+from veer.exception import RemoteError
+from veer.spool import Spool
+
+SPOOL_DIR = osp.join(tempfile.gettempdir(), f"veer_test_spool_{os.getpid()}")
+
+
+@veer.in_subprocess(backend="spool", spool_dir=SPOOL_DIR)
+def get_pid_spooled(duration):
+    time.sleep(duration)
+    return os.getpid()
+
+
+@veer.in_subprocess(backend="spool", spool_dir=SPOOL_DIR)
+def raise_spooled():
+    raise ValueError("Expected failure.")
+
+
+@veer.in_subprocess(backend="spool", spool_dir=SPOOL_DIR)
+def unpicklable_spooled():
+    return threading.Lock()
+
+
+def tearDownModule():
+    shutil.rmtree(SPOOL_DIR, ignore_errors=True)
+
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.consumers = [
+            sp.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "veer.spool",
+                    "consume",
+                    SPOOL_DIR,
+                    "--idle-timeout",
+                    "30",
+                ],
+                cwd=osp.dirname(osp.abspath(__file__)),
+            )
+            for _ in range(3)
+        ]
+
+    def tearDown(self):
+        for consumer in self.consumers:
+            consumer.kill()
+            consumer.wait()
+
+    def test_consumers(self):
+        with cf.ThreadPoolExecutor(max_workers=6) as executor:
+            pids = list(executor.map(get_pid_spooled, [0.5] * 6))
+
+        consumer_pids = {consumer.pid for consumer in self.consumers}
+        self.assertTrue(set(pids) <= consumer_pids)
+        self.assertGreater(len(set(pids)), 1)
+
+    def test_remote_error(self):
+        with self.assertRaises(RemoteError):
+            raise_spooled()
+
+    def test_unpicklable_result(self):
+        with self.assertRaises(RemoteError):
+            unpicklable_spooled()
+        # consumers survive and the failed job is not retried
+        self.assertTrue(all(consumer.poll() is None for consumer in self.consumers))
+        self.assertEqual(os.listdir(osp.join(SPOOL_DIR, "claimed")), [])
+        self.assertEqual(os.listdir(osp.join(SPOOL_DIR, "tmp")), [])
+        self.assertIsInstance(get_pid_spooled(0.0), int)
+
+
+def expire(directory):
+    "Expire the leases of all claimed jobs."
+    past = time.time() - 60
+    for filename in os.listdir(osp.join(directory, "claimed")):
+        os.utime(osp.join(directory, "claimed", filename), (past, past))
+
+
+class TestSpoolLease(unittest.TestCase):
+    def test_requeue_expired(self):
+        with tempfile.TemporaryDirectory() as directory:
+            queue = Spool(directory, lease=10.0)
+
+            job_id = queue.submit({"foo": "bar"})
+            self.assertEqual(queue.claim(), (job_id, {"foo": "bar"}))
+            self.assertIsNone(queue.claim())
+
+            # consumer still alive
+            self.assertEqual(queue.requeue_expired(), 0)
+
+            # consumer crashed without renewing its lease
+            expire(directory)
+            self.assertEqual(queue.requeue_expired(), 1)
+            self.assertEqual(queue.claim(), (job_id, {"foo": "bar"}))
+
+            queue.complete(job_id, 42)
+            self.assertEqual(queue.get_result(job_id), 42)
+
+    def test_expired_claim(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stalled = Spool(directory, lease=10.0)
+            other = Spool(directory, lease=10.0)
+
+            job_id = stalled.submit("job")
+            stalled.claim()
+            expire(directory)
+            other.requeue_expired()
+            self.assertEqual(other.claim(), (job_id, "job"))
+
+            # the result of the consumer that lost its claim is discarded
+            stalled.complete(job_id, "stalled")
+            with self.assertRaises(FileNotFoundError):
+                other.get_result(job_id)
+            other.complete(job_id, "other")
+            self.assertEqual(other.get_result(job_id), "other")
+            self.assertEqual(os.listdir(osp.join(directory, "tmp")), [])
+
+    def test_max_attempts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            queue = Spool(directory, lease=10.0, max_attempts=2)
+
+            job_id = queue.submit("poison")
+            for _ in range(2):
+                self.assertEqual(queue.claim(), (job_id, "poison"))
+                expire(directory)
+                queue.requeue_expired()
+
+            claimed_id, error = queue.claim()
+            self.assertEqual(claimed_id, job_id)
+            self.assertIsInstance(error, RemoteError)
+            queue.complete(job_id, error)
+            self.assertIsInstance(queue.get_result(job_id), RemoteError)
+
+    def test_cancel(self):
+        with tempfile.TemporaryDirectory() as directory:
+            queue = Spool(directory)
+
+            job_id = queue.submit(None)
+            queue.cancel(job_id)
+            self.assertIsNone(queue.claim())
+
+            job_id = queue.submit(None)
+            self.assertEqual(queue.claim(), (job_id, None))
+            queue.cancel(job_id)
+            queue.complete(job_id, 42)
+            with self.assertRaises(FileNotFoundError):
+                queue.get_result(job_id)
+            self.assertEqual(os.listdir(osp.join(directory, "cancelled")), [])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import os.path as osp
+import tempfile
+import time
+import unittest
+import veer
+from veer import metrics
+from veer.exception import RemoteTimeoutError
+
+
+@veer.in_subprocess(timeout=2.0)
+def sleep_with_timeout(duration):
+    time.sleep(duration)
+    return duration
+
+
+@veer.in_subprocess(idempotent=True, hedge_percentile=50)
+def slow_unless_marked(marker):
+    "Sleep for a long time unless `marker` exists - which we create."
+    if not osp.exists(marker):
+        with open(marker, "w"):
+            pass
+        time.sleep(60)
+    return os.getpid()
+
+
+class TestTimeouts(unittest.TestCase):
+    def test_timeout(self):
+        self.assertEqual(sleep_with_timeout(0.0), 0.0)
+
+        start = time.monotonic()
+        with self.assertRaises(RemoteTimeoutError):
+            sleep_with_timeout(60)
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertEqual(sleep_with_timeout.get_stats()["timeouts"], 1)
+
+    def test_hedging_requires_idempotent(self):
+        with self.assertRaises(ValueError):
+            veer.in_subprocess(hedge_percentile=99)(time.sleep)
+
+
+class TestHedging(unittest.TestCase):
+    def setUp(self):
+        self._min_samples = veer.get_config("hedging.min_samples")
+        veer.set_config("hedging.min_samples", 3)
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.marker = osp.join(self._tmpdir.name, "marker")
+
+    def tearDown(self):
+        veer.set_config("hedging.min_samples", self._min_samples)
+        self._tmpdir.cleanup()
+
+    def test_hedge_wins(self):
+        # record some latencies of fast executions
+        with open(self.marker, "w"):
+            pass
+        for _ in range(3):
+            slow_unless_marked(self.marker)
+        self.assertEqual(slow_unless_marked.get_stats()["hedges_launched"], 0)
+
+        def count(outcome):
+            return metrics.snapshot()["veer_calls_total"].get(
+                (slow_unless_marked._qualified_name, outcome), 0
+            )
+
+        errors = count("error")
+        cancelled = count("cancelled")
+        os.remove(self.marker)
+        start = time.monotonic()
+        slow_unless_marked(self.marker)
+        self.assertLess(time.monotonic() - start, 30)
+
+        stats = slow_unless_marked.get_stats()
+        self.assertEqual(stats["hedges_launched"], 1)
+        self.assertEqual(stats["hedges_won"], 1)
+
+        # the cancelled execution is not counted as error
+        while count("cancelled") == cancelled and time.monotonic() - start < 30:
+            time.sleep(0.1)
+        self.assertEqual(count("cancelled"), cancelled + 1)
+        self.assertEqual(count("error"), errors)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import json
+import os
+import tempfile
+import unittest
+import veer
+from veer import tracing
+
+
+@veer.in_subprocess
+def add(a, b):
+    return a + b
+
+
+@veer.in_subprocess(workers=1)
+def add_worker(a, b):
+    return a + b
+
+
+class TestTracing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        tracing.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        tracing.disable()
+
+    def get_events(self, call_id):
+        return [
+            e
+            for e in tracing.get_events()
+            if e.get("args", {}).get("call_id") == call_id
+        ]
+
+    def test_estimate_offset(self):
+        # child clock 100us ahead, 10us latency each way
+        self.assertEqual(tracing.estimate_offset(0, 110, 150, 60), 100)
+
+    def test_spans(self):
+        self.assertEqual(add(1, 2), 3)
+        call_id = max(
+            e["args"]["call_id"] for e in tracing.get_events() if e["name"] == "call"
+        )
+        events = {(e["cat"], e["name"]): e for e in self.get_events(call_id)}
+        for name in ["call", "queue", "spawn", "accept", "send", "wait", "recv"]:
+            self.assertIn(("host", name), events)
+        for name in ["import", "recv", "run", "send"]:
+            self.assertIn(("child", name), events)
+
+        # child spans are aligned to the host's clock
+        call = events["host", "call"]
+        for name in ["recv", "run", "send"]:
+            child = events["child", name]
+            self.assertNotEqual(child["pid"], os.getpid())
+            self.assertGreaterEqual(child["ts"], call["ts"])
+            self.assertLessEqual(child["ts"] + child["dur"], call["ts"] + call["dur"])
+
+    def test_workers(self):
+        for i in range(3):
+            self.assertEqual(add_worker(i, 1), i + 1)
+        call_ids = {
+            e["args"]["call_id"]
+            for e in tracing.get_events()
+            if e["name"] == "run" and e["pid"] != os.getpid()
+        }
+        self.assertGreaterEqual(len(call_ids), 3)
+
+    def test_write(self):
+        add(1, 2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            tracing.write(path)
+            with open(path) as f:
+                trace = json.load(f)
+        names = {e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+        self.assertIn("veer host", names)
+        self.assertIn(f"veer child {add._qualified_name}", names)
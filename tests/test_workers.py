@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import concurrent.futures as cf
+import os
+import time
+import unittest
+import veer
+from veer.exception import RemoteError
+
+leaked = []
+
+
+@veer.in_subprocess(workers=1)
+def get_pid_persistent(fail=False):
+    if fail:
+        raise ValueError("Expected failure.")
+    return os.getpid()
+
+
+@veer.in_subprocess(workers=1, max_calls_per_child=2)
+def get_pid_max_calls():
+    return os.getpid()
+
+
+@veer.in_subprocess(workers=1, max_rss=1 << 50)
+def leak(nbytes):
+    leaked.append(b"\1" * nbytes)
+    return os.getpid()
+
+
+@veer.in_subprocess(timeout=60)
+def get_pid_once():
+    return os.getpid()
+
+
+@veer.in_subprocess(workers=1, max_child_age=1.0)
+def get_pid_max_age():
+    return os.getpid()
+
+
+class TestWorkers(unittest.TestCase):
+    def test_reuse(self):
+        pids = [get_pid_persistent() for _ in range(3)]
+        self.assertEqual(len(set(pids)), 1)
+        self.assertNotEqual(pids[0], os.getpid())
+
+        # errors raised by the function keep the child alive
+        with self.assertRaises(RemoteError):
+            get_pid_persistent(fail=True)
+        self.assertEqual(get_pid_persistent(), pids[0])
+
+    def test_max_calls(self):
+        with self.assertLogs("veer.worker", level="INFO") as logs:
+            pids = [get_pid_max_calls() for _ in range(5)]
+
+        self.assertEqual(pids[0], pids[1])
+        self.assertEqual(pids[2], pids[3])
+        self.assertEqual(len(set(pids)), 3)
+        self.assertIn("max_calls_per_child", logs.output[0])
+        self.assertEqual(get_pid_max_calls.get_stats()["recycles"], 2)
+
+    def test_max_rss(self):
+        first = leak(0)
+        pool = leak._get_worker_pool()
+        pool.max_rss = pool._idle[0].rss + (32 << 20)
+
+        self.assertEqual(leak(0), first)
+        with self.assertLogs("veer.worker", level="INFO") as logs:
+            self.assertEqual(leak(64 << 20), first)
+            self.assertNotEqual(leak(0), first)
+        self.assertIn("max_rss", logs.output[0])
+
+    def test_max_age(self):
+        first = get_pid_max_age()
+        self.assertEqual(get_pid_max_age(), first)
+        time.sleep(1.0)
+        with self.assertLogs("veer.worker", level="INFO") as logs:
+            self.assertNotEqual(get_pid_max_age(), first)
+        self.assertIn("max_age", logs.output[0])
+
+    def test_idle_children_yield_slots(self):
+        config = veer.get_config("scheduler.max_children")
+        self.addCleanup(veer.set_config, "scheduler.max_children", config)
+        veer.set_config("scheduler.max_children", 1)
+
+        # the idle child of the pool is retired for the call of another function
+        pid = get_pid_persistent()
+        self.assertNotEqual(get_pid_once(), pid)
+
+        # ... also if the other function is already waiting when it becomes idle
+        pool = get_pid_persistent._get_worker_pool()
+        child = pool.acquire()
+        pid = child.process.pid
+        with cf.ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(get_pid_once)
+            time.sleep(0.5)
+            self.assertFalse(future.done())
+            pool.release(child)
+            self.assertNotEqual(future.result(timeout=30), pid)
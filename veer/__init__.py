@@ -4,6 +4,8 @@
 from .config import get_config, set_config, read_set_config  # noqa: F401
 from .core import in_container, in_subprocess  # noqa: F401
 from .logcfg import log  # noqa: F401
+from .objects import put  # noqa: F401
+from .pipelines import pipeline  # noqa: F401
 
 
 # Avoid needlessly importing pbr by determining __version__ only if the user explicitly
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Scatter a numpy array across children and gather the results.
+
+The array is written once to shared memory (`/dev/shm`, or the scratch
+directory if unavailable or for the spool backend). Each child only receives a
+small descriptor of its chunk, which is unpickled as a copy-on-write memory map
+of the shared file, so the data is never copied through the socket.
+"""
+
+__all__ = [
+    "REDUCTIONS",
+    "map_array",
+]
+
+import concurrent.futures as cf
+import logging
+import os
+import os.path as osp
+
+from .scratch import MappedResult, get_scratch_dir
+
+log = logging.getLogger(__name__)
+
+REDUCTIONS = ["concatenate", "sum"]
+
+_SHM_DIR = "/dev/shm"
+
+
+def map_array(
+    veerified,
+    array,
+    *args,
+    axis=0,
+    chunks=None,
+    reduce="concatenate",
+    out=None,
+    **kwargs,
+):
+    """Split `array` along `axis` and execute `veerified` on each chunk in a
+    separate child (see `Veerify.map_array`).
+
+    Returns:
+        Combined results of all chunks.
+    """
+    import numpy as np
+
+    array = np.asarray(array)
+    axis = axis % array.ndim
+    length = array.shape[axis]
+    if length == 0:
+        raise ValueError(f"Cannot split empty axis {axis} of array {array.shape}.")
+    if chunks is None:
+        chunks = len(os.sched_getaffinity(0))
+    chunks = max(1, min(int(chunks), length))
+    bounds = [(length * i) // chunks for i in range(chunks + 1)]
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+
+    gather = _Gather(array, axis, ranges, reduce, out)
+
+    if "DEBUG" in os.environ or "VEER_NO_SUBPROCESS" in os.environ:
+        for index, (start, stop) in enumerate(ranges):
+            chunk = _take(array, axis, start, stop)
+            gather.add(index, veerified._func(chunk, *args, **kwargs))
+        return gather.result()
+
+    shared = None
+    # arrays of python objects cannot be mapped and are sent chunk by chunk
+    if array.nbytes > 0 and not array.dtype.hasobject:
+        shared = MappedResult.dump(array, directory=_get_shm_dir(veerified))
+    try:
+        with cf.ThreadPoolExecutor(
+            max_workers=chunks, thread_name_prefix=f"veer-{veerified._func_name}"
+        ) as executor:
+            futures = {}
+            for index, (start, stop) in enumerate(ranges):
+                if shared is None:
+                    chunk = _take(array, axis, start, stop)
+                else:
+                    chunk = _Chunk(shared, axis, start, stop)
+                futures[executor.submit(veerified, chunk, *args, **kwargs)] = index
+
+            try:
+                # combine results as chunks complete
+                for future in cf.as_completed(futures):
+                    gather.add(futures[future], future.result())
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        if shared is not None:
+            os.remove(shared.path)
+
+    return gather.result()
+
+
+def _get_shm_dir(veerified):
+    # spool consumers may run on other machines and need a shared filesystem
+    if veerified._backend != "spool" and osp.isdir(_SHM_DIR):
+        return _SHM_DIR
+    return get_scratch_dir()
+
+
+def _load_chunk(path, dtype, shape, axis, start, stop):
+    """Map a chunk of an array written by `map_array` (in the child)."""
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    if axis == 0:
+        # chunks along the first axis are contiguous, only map the chunk
+        row_nbytes = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        mapped = np.memmap(
+            path,
+            dtype=dtype,
+            mode="c",
+            offset=start * row_nbytes,
+            shape=(stop - start,) + tuple(shape[1:]),
+        )
+    else:
+        mapped = _take(
+            np.memmap(path, dtype=dtype, mode="c", shape=tuple(shape)),
+            axis,
+            start,
+            stop,
+        )
+    # the view keeps the mapping alive
+    return np.asarray(mapped)
+
+
+def _take(array, axis, start, stop):
+    index = [slice(None)] * array.ndim
+    index[axis] = slice(start, stop)
+    return array[tuple(index)]
+
+
+class _Chunk(object):
+    """Descriptor of a chunk of a shared array that is unpickled as the chunk
+    itself."""
+
+    def __init__(self, shared, axis, start, stop):
+        self.shared = shared
+        self.axis = axis
+        self.start = start
+        self.stop = stop
+
+    def __reduce__(self):
+        return (
+            _load_chunk,
+            (
+                self.shared.path,
+                self.shared.dtype,
+                self.shared.shape,
+                self.axis,
+                self.start,
+                self.stop,
+            ),
+        )
+
+
+class _Gather(object):
+    """Combines the results of chunks in the order they complete."""
+
+    def __init__(self, array, axis, ranges, reduce, out):
+        if not callable(reduce) and reduce not in REDUCTIONS:
+            raise ValueError(
+                f"Unknown reduction {reduce}, choose from {REDUCTIONS} or pass a "
+                "callable."
+            )
+        self.array = array
+        self.axis = axis
+        self.ranges = ranges
+        self.reduce = reduce
+        self.out = out
+        self._allocated = False
+        self._written = []
+        self._accumulated = None
+        self._pending = {}
+
+    def add(self, index, result):
+        import numpy as np
+
+        if self.reduce == "concatenate":
+            start, stop = self.ranges[index]
+            result = np.asarray(result)
+            if self.out is None and len(self._pending) == 0:
+                # chunks mapped to results of the same length along the axis
+                # are written to the preallocated output right away
+                if result.ndim == self.array.ndim and result.shape[self.axis] == (
+                    stop - start
+                ):
+                    shape = list(result.shape)
+                    shape[self.axis] = self.array.shape[self.axis]
+                    self.out = np.empty(shape, dtype=result.dtype)
+                    self._allocated = True
+            if (
+                self.out is not None
+                and result.ndim == self.out.ndim
+                and result.shape[self.axis] == stop - start
+            ):
+                _take(self.out, self.axis, start, stop)[...] = result
+                self._written.append(index)
+            else:
+                if self._allocated:
+                    # the first results merely happened to keep their length:
+                    # fall back to concatenating all results in the end
+                    for written in self._written:
+                        self._pending[written] = _take(
+                            self.out, self.axis, *self.ranges[written]
+                        )
+                    self.out = None
+                    self._allocated = False
+                    self._written = []
+                self._pending[index] = result
+        elif self._accumulated is None:
+            if self.reduce == "sum" and self.out is not None:
+                self.out[...] = result
+                self._accumulated = self.out
+            elif self.reduce == "sum":
+                self._accumulated = np.array(result, copy=True)
+            else:
+                self._accumulated = result
+        elif self.reduce == "sum":
+            self._accumulated += result
+        else:
+            self._accumulated = self.reduce(self._accumulated, result)
+
+    def result(self):
+        import numpy as np
+
+        if self.reduce != "concatenate":
+            return self._accumulated
+        if len(self._pending) == 0:
+            return self.out
+        if len(self._pending) < len(self.ranges):
+            raise ValueError(
+                "Results of chunks have to be of the same length as the chunk "
+                "along the axis to be gathered into a preallocated output."
+            )
+        # results of varying length are concatenated once all are known
+        results = [self._pending[index] for index in range(len(self.ranges))]
+        if self.out is None:
+            return np.concatenate(results, axis=self.axis)
+        return np.concatenate(results, axis=self.axis, out=self.out)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""In-process execution backends that avoid spawning a new interpreter.
+
+* `subinterpreter`: each call is executed in a PEP 734 subinterpreter
+  (`concurrent.interpreters`, Python 3.14+), which does not share any module
+  state with the host. Interpreters are reused across calls of the same
+  function, so the defining module is only imported once per interpreter.
+* `thread`: each call is executed in a thread of the host (only on
+  free-threaded builds, where it runs in parallel to the host). Arguments and
+  return values are still passed as pickled copies.
+
+If the running Python does not support the requested backend, calls fall back
+to the subprocess backend.
+"""
+
+__all__ = [
+    "InterpreterPool",
+    "execute_pickled",
+    "get_effective_backend",
+    "pickle_result",
+    "supports_free_threading",
+    "supports_subinterpreters",
+]
+
+import collections
+import importlib
+import importlib.util
+import logging
+import pickle as pkl
+import sys
+import threading
+
+from .exception import RemoteError
+
+log = logging.getLogger(__name__)
+
+
+def execute_pickled(module_name, func_name, func_dir, payload):
+    """Execute a veerified function from pickled arguments (also used as entry
+    point in subinterpreters).
+
+    Args:
+        module_name: Name of the module defining the veerified function.
+
+        func_name: Name of the veerified function in its module.
+
+        func_dir: Directory needed in sys.path to import the module.
+
+        payload: Pickled tuple of positional and keyword arguments.
+
+    Returns:
+        Pickled return value or RemoteError.
+    """
+    try:
+        if func_dir not in sys.path:
+            sys.path.append(func_dir)
+        veerified = getattr(importlib.import_module(module_name), func_name)
+        args, kwargs = pkl.loads(payload)
+        retval = veerified._execute(args, kwargs)
+    except Exception:
+        retval = RemoteError()
+        retval.wrap_exception()
+    return pickle_result(retval)
+
+
+def get_effective_backend(backend):
+    """Get the backend calls are actually executed with.
+
+    Args:
+        backend: Requested backend.
+
+    Returns:
+        `backend` if it is supported by the running Python, `subprocess`
+        otherwise.
+    """
+    if backend == "subinterpreter" and not supports_subinterpreters():
+        log.info("Subinterpreters not supported, falling back to subprocess.")
+        return "subprocess"
+    if backend == "thread" and not supports_free_threading():
+        log.info("Python build is not free-threaded, falling back to subprocess.")
+        return "subprocess"
+    return backend
+
+
+def pickle_result(retval):
+    """Pickle a return value, wrapping errors in a RemoteError."""
+    try:
+        return pkl.dumps(retval, protocol=pkl.HIGHEST_PROTOCOL)
+    except Exception:
+        wrapped = RemoteError()
+        wrapped.wrap_exception()
+        return pkl.dumps(wrapped, protocol=pkl.HIGHEST_PROTOCOL)
+
+
+def supports_free_threading():
+    """Check if the running Python executes threads in parallel (no GIL)."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def supports_subinterpreters():
+    """Check if the running Python provides `concurrent.interpreters`."""
+    try:
+        return importlib.util.find_spec("concurrent.interpreters") is not None
+    except ImportError:
+        return False
+
+
+class InterpreterPool(object):
+    """Idle subinterpreters of a single veerified function."""
+
+    def __init__(self):
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Get an idle interpreter (creating one if there is none)."""
+        with self._lock:
+            if len(self._idle) > 0:
+                return self._idle.popleft()
+
+        from concurrent import interpreters
+
+        return interpreters.create()
+
+    def close(self):
+        """Close all idle interpreters."""
+        with self._lock:
+            idle, self._idle = list(self._idle), collections.deque()
+        for interpreter in idle:
+            interpreter.close()
+
+    def release(self, interpreter, healthy=True):
+        """Hand back an interpreter after a call.
+
+        Args:
+            interpreter: Interpreter obtained via `acquire`.
+
+            healthy: If False, the interpreter is closed instead of being
+                     reused.
+        """
+        if not healthy:
+            interpreter.close()
+            return
+        with self._lock:
+            self._idle.append(interpreter)
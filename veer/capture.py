@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Capture the serialized arguments and results of calls for offline
+performance testing (see `benchmarks/replay.py`).
+
+Capturing is enabled by setting `capture.file` (or VEER_CAPTURE). Each
+successful call is recorded with probability `capture.sample_rate` until the
+file reaches `capture.max_bytes`. Payloads are serialized the way they would be
+sent to the child (`serialization.dumps` with the function's preferred
+serializer); arguments with a type serializer are recorded as separate
+`arguments` payloads following the others, just like they are sent.
+
+The file starts with MAGIC, followed by one entry per payload: the length of a
+JSON header (4 bytes, little endian), the header (`function`, `call_id`,
+`kind`, `serializer`, `nbytes`, `time`) and the serialized payload.
+"""
+
+__all__ = [
+    "MAGIC",
+    "Capture",
+    "Payload",
+    "get_capture",
+    "read",
+]
+
+import json
+import logging
+import random
+import struct
+import threading
+import time
+
+from . import serialization
+from .config import get_config
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"VEERCAP1\n"
+
+_HEADER_LEN = struct.Struct("<I")
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+def get_capture():
+    """Get the Capture writing to `capture.file` (None if disabled)."""
+    global _capture
+    path = get_config("capture.file")
+    if not path:
+        return None
+    with _capture_lock:
+        if _capture is None or _capture.path != path:
+            if _capture is not None:
+                _capture.close()
+            _capture = Capture(path)
+            log.info(f"Capturing call payloads to {path}.")
+        return _capture
+
+
+def read(path):
+    """Iterate over the payloads in a capture file.
+
+    Yields:
+        Payload-instances in the order they were recorded.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a veer capture file.")
+        while True:
+            prefix = f.read(_HEADER_LEN.size)
+            if len(prefix) < _HEADER_LEN.size:
+                # end of file (or truncated by a host that was killed)
+                return
+            (header_len,) = _HEADER_LEN.unpack(prefix)
+            header = json.loads(f.read(header_len))
+            data = f.read(header["nbytes"])
+            if len(data) < header["nbytes"]:
+                return
+            yield Payload(data=data, **header)
+
+
+class Capture(object):
+    "Appends payloads to a capture file."
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        self._nbytes = self._file.tell()
+        self._full = False
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def record(self, function, call_id, payloads, preferred=None):
+        """Serialize and append the payloads of a call (either all or none).
+
+        Args:
+            function: Qualified name of the veerified function.
+
+            call_id: ID of the call.
+
+            payloads: List of tuples of the kind of each payload (`arguments`
+                      or `result`) and the object to serialize (arguments may
+                      consist of several payloads, see
+                      `Veerify._send_arguments`).
+
+            preferred: Serializer preferred by the function.
+
+        Returns:
+            True if the payloads were recorded, False if the size cap is
+            reached.
+        """
+        entries = []
+        size = 0
+        for kind, obj in payloads:
+            name, buffers = serialization.dumps(obj, preferred=preferred)
+            buffers = [memoryview(buffer) for buffer in buffers]
+            nbytes = sum(buffer.nbytes for buffer in buffers)
+            header = json.dumps(
+                {
+                    "function": function,
+                    "call_id": call_id,
+                    "kind": kind,
+                    "serializer": name,
+                    "nbytes": nbytes,
+                    "time": time.time(),
+                }
+            ).encode()
+            entries.append((header, buffers))
+            size += _HEADER_LEN.size + len(header) + nbytes
+
+        with self._lock:
+            if self._full or self._file.closed:
+                return False
+            max_bytes = int(get_config("capture.max_bytes"))
+            if self._nbytes + size > max_bytes:
+                self._full = True
+                log.info(f"Capture file {self.path} reached {max_bytes} bytes.")
+                return False
+            for header, buffers in entries:
+                self._file.write(_HEADER_LEN.pack(len(header)))
+                self._file.write(header)
+                for buffer in buffers:
+                    self._file.write(buffer)
+            self._file.flush()
+            self._nbytes += size
+        return True
+
+    def should_sample(self):
+        """Decide whether the next call is recorded."""
+        return not self._full and random.random() < float(
+            get_config("capture.sample_rate")
+        )
+
+
+class Payload(object):
+    "Payload read from a capture file."
+
+    def __init__(self, function, call_id, kind, serializer, nbytes, time, data):
+        self.function = function
+        self.call_id = call_id
+        self.kind = kind
+        self.serializer = serializer
+        self.nbytes = nbytes
+        self.time = time
+        self.data = data
+
+    def load(self):
+        """Deserialize the payload."""
+        return serialization.loads(self.serializer, bytearray(self.data))
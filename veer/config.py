@@ -33,11 +33,31 @@ config_entry_to_env_variable = {
     "singularity.binary": "VEER_SINGULARITY_BINARY",
     "default_container.image": "VEER_CONTAINER_IMAGE",
     "default_container.app": "VEER_CONTAINER_APP",
+    "scratch.directory": "VEER_SCRATCH_DIR",
+    "spool.directory": "VEER_SPOOL_DIR",
+    "metrics.http_port": "VEER_METRICS_PORT",
+    "metrics.textfile": "VEER_METRICS_TEXTFILE",
+    "tracing.file": "VEER_TRACE",
+    "logging.forward_level": "VEER_LOG_FORWARD",
+    "logging.buffer_size": "VEER_LOG_BUFFER_SIZE",
+    "logging.flush_interval": "VEER_LOG_FLUSH_INTERVAL",
+    "capture.file": "VEER_CAPTURE",
+    "capture.sample_rate": "VEER_CAPTURE_SAMPLE_RATE",
 }
 
 defaults = {
     "singularity": {"binary": "singularity"},
     "python": {"binary": "python"},
+    "scratch": {"mmap_threshold": 1 << 20},
+    "hedging": {"min_samples": 20, "history": 1000},
+    "scheduler": {"policy": "fifo"},
+    "spool": {"lease": 60.0, "poll_interval": 0.1, "max_attempts": 3},
+    "metrics": {"textfile_interval": 15.0},
+    "workers": {"shutdown_timeout": 10.0},
+    "objects": {"ref_threshold": 1 << 20, "cache_size": 1 << 30},
+    "launcher": {"method": "posix_spawn"},
+    "logging": {"buffer_size": 10000, "flush_interval": 0.5},
+    "capture": {"sample_rate": 1.0, "max_bytes": 1 << 30},
 }
 
 _config = None
@@ -122,6 +142,60 @@ def read_config(config_path=None):
     default_container:
       image: <path to default container>
       app: <name of default container>
+
+    scratch:
+      directory: <directory to exchange memory-mapped results in>
+      mmap_threshold: <minimum size in bytes of memory-mapped results>
+
+    hedging:
+      min_samples: <number of recorded latencies needed before hedging>
+      history: <number of latencies to keep per function>
+
+    scheduler:
+      max_children: <maximum number of live children in this process>
+      policy: <fifo or fair>
+      quotas:
+        <module>.<function>: <maximum number of live children of function>
+
+    placement:
+      cpus_per_child: <number of CPUs each child is pinned to>
+
+    spool:
+      directory: <job directory of the spool backend>
+      lease: <seconds after which jobs of unresponsive consumers are requeued>
+      poll_interval: <seconds between checks for new jobs/results>
+      max_attempts: <give up on jobs claimed this often without completing>
+
+    workers:
+      max_calls_per_child: <replace long-lived children after this many calls>
+      max_rss: <replace long-lived children exceeding this many bytes of RSS>
+      max_age: <replace long-lived children older than this many seconds>
+      shutdown_timeout: <seconds retired children get to exit before killed>
+
+    objects:
+      ref_threshold: <minimum size in bytes of arguments sent by reference>
+      cache_size: <maximum bytes of objects kept by each long-lived child>
+
+    launcher:
+      method: <popen or posix_spawn (launch time independent of host memory)>
+
+    metrics:
+      http_port: <serve Prometheus metrics on this local port>
+      textfile: <periodically write Prometheus metrics to this file>
+      textfile_interval: <seconds between writes of the textfile>
+
+    tracing:
+      file: <record spans and write them as Chrome trace JSON on exit>
+
+    logging:
+      forward_level: <forward child log records of this level to the host>
+      buffer_size: <maximum number of records buffered by each child>
+      flush_interval: <seconds between batches sent during a call>
+
+    capture:
+      file: <record serialized arguments and results of calls to this file>
+      sample_rate: <fraction of calls that are recorded>
+      max_bytes: <stop recording once the file reaches this size>
     ```
 
     Args:
@@ -6,24 +6,49 @@ __all__ = [
     "in_container",
 ]
 
+import ast
 import atexit
-import distutils.spawn as ds
+import collections
+import concurrent.futures as cf
+import hashlib
+import inspect
+import itertools
 import logging
+import math
 import os
 import os.path as osp
+import pickle as pkl
+import shutil
 import socket as skt
-import subprocess as sp
 import sys
 import tempfile
-
-from . import util
+import textwrap
+import threading
+import time
+
+from . import (
+    backends,
+    capture,
+    launcher,
+    logforward,
+    metrics,
+    objects,
+    placement,
+    scratch,
+    serialization,
+    tracing,
+    util,
+)
 from .config import get_config
-from .exception import RemoteError
+from .exception import RemoteError, RemoteTimeoutError
+from .scheduler import get_priority, get_scheduler
 
 log = logging.getLogger(__name__)
 
+_call_ids = itertools.count()
+
 
-def in_container(image=None, app=None):
+def in_container(image=None, app=None, **kwargs):
     """Wrapper to execute given function in a singularity container image
     explicitly.
 
@@ -33,19 +58,28 @@ def in_container(image=None, app=None):
 
         app: String pointing to the singluarity image to be used. If None the
              default container will be used.
+
+        kwargs: Further keyword arguments are passed on to `Veerify`.
     """
 
     def _wrapper(func):
         return Veerify(
-            func, container_image=image, container_app=app, always_in_container=True
+            func,
+            container_image=image,
+            container_app=app,
+            always_in_container=True,
+            **kwargs,
         )
 
     return _wrapper
 
 
-def in_subprocess(func):
+def in_subprocess(func=None, **kwargs):
     """A functor that replaces the original function.
 
+    Can be used as plain decorator or be called with keyword arguments that are
+    passed on to `Veerify` (e.g., `@in_subprocess(mmap_results=True)`).
+
     If VEER_SINGULARITY is defined or VEER_CONTAINER_IMAGE and
     VEER_CONTAINER_APP are defined, the subprocess is run in a singularity
     container.
@@ -57,33 +91,63 @@ def in_subprocess(func):
     If functions should always be executed in containers, use
     `run_in_container` instead.
     """
-    return Veerify(func)
+
+    def _wrapper(func):
+        return Veerify(func, **kwargs)
+
+    if func is None:
+        return _wrapper
+    else:
+        return _wrapper(func)
 
 
 class Veerify(object):
     """
-        A functor that replaces the original function.
+    A functor that replaces the original function.
 
-        If VEER_SINGULARITY is defined or VEER_CONTAINER_IMAGE and
-        VEER_CONTAINER_APP are defined, the subprocess is run in a singularity
-        container.
+    If VEER_SINGULARITY is defined or VEER_CONTAINER_IMAGE and
+    VEER_CONTAINER_APP are defined, the subprocess is run in a singularity
+    container.
 
-        If VEER_SINGULARITY is defined, functions are run with the app
-        `visionary-simulations` in the container `/containers/stable/latest`
-        (VEER_CONTAINER_APP/VEER_CONTAINER_IMAGE can be used to overwrite this.
+    If VEER_SINGULARITY is defined, functions are run with the app
+    `visionary-simulations` in the container `/containers/stable/latest`
+    (VEER_CONTAINER_APP/VEER_CONTAINER_IMAGE can be used to overwrite this.
 
-        If functions should always be executed in containers, use
-        `RunInContainer` instead.
+    If functions should always be executed in containers, use
+    `RunInContainer` instead.
     """
 
     def __call__(self, *args, **kwargs):
         if "DEBUG" in os.environ or "VEER_NO_SUBPROCESS" in os.environ:
+            args, kwargs = objects.dereference(args, kwargs)
             return self._func(*args, **kwargs)
+        elif self._single_flight:
+            return self._host_single_flight(args, kwargs)
         else:
-            return self._host(*args, **kwargs)
+            return self._dispatch(args, kwargs)
 
     def __init__(
-        self, func, container_image=None, container_app=None, always_in_container=False
+        self,
+        func,
+        container_image=None,
+        container_app=None,
+        always_in_container=False,
+        mmap_results=False,
+        imports=None,
+        timeout=None,
+        idempotent=False,
+        hedge_percentile=None,
+        priority="normal",
+        quota=None,
+        cpus=None,
+        serializer=None,
+        backend="subprocess",
+        spool_dir=None,
+        single_flight=False,
+        workers=None,
+        max_calls_per_child=None,
+        max_rss=None,
+        max_child_age=None,
     ):
         """
         The following kwargs apply to RunInContainer:
@@ -92,6 +156,79 @@ class Veerify(object):
         container_app: name of container app in which to run function
         always_in_container: if True we always run in container
 
+        The following kwargs apply to all modes of execution:
+
+        mmap_results: if True, large results (bytes or numpy arrays exceeding
+                      `scratch.mmap_threshold`) are written by the child to a
+                      memory-mapped file in the scratch directory
+                      (`scratch.directory`) instead of being sent via socket.
+                      The host then receives a lazily loaded `numpy.memmap`
+                      (copy-on-write) or read-only `mmap.mmap` respectively.
+        imports: if not None, the child does not import the module the function
+                 was defined in (thereby skipping its top-level code) but only
+                 the given list of imports before defining the function from
+                 its source. Entries are module names (optionally with
+                 `as <alias>`) or complete `import`/`from` statements. The
+                 function must then only depend on its arguments and the
+                 listed imports.
+        timeout: if not None, maximum time in seconds a call may take. If it is
+                 exceeded, the child (including all its descendants) is killed
+                 and `veer.exception.RemoteTimeoutError` is raised.
+        idempotent: if True, the function may safely be executed several times
+                    for the same call (needed for hedging).
+        hedge_percentile: if not None (requires idempotent=True), launch a
+                          duplicate of a call once it takes longer than the
+                          given percentile (0-100) of previous call latencies.
+                          The first finished execution is returned, the other
+                          one is cancelled. Hedging starts after
+                          `hedging.min_samples` calls have been recorded.
+        priority: priority class (`high`, `normal`, `low`) or int (lower is
+                  more important) used by the process-wide scheduler when the
+                  number of live children is limited via
+                  `scheduler.max_children`.
+        quota: maximum number of live children of this function. If None, it is
+               taken from `scheduler.quotas.<module>.<function>`.
+        cpus: number of CPUs each child is pinned to. CPU sets of concurrently
+              running children are disjoint (as long as enough CPUs are
+              available) and confined to a single NUMA node if possible.
+              OMP_NUM_THREADS, OPENBLAS_NUM_THREADS and MKL_NUM_THREADS are set
+              accordingly. If None, `placement.cpus_per_child` is used; if that
+              is not set either, children are not pinned.
+        serializer: name of the serializer to prefer for arguments and return
+                    values (e.g., `msgpack`). If the other side does not
+                    support it or it cannot encode a payload, the serializer
+                    registered for the payload's type (see
+                    `veer.serialization.set_type_serializer`) or pickle is used.
+        backend: `subprocess` (default) spawns a child per call. `spool`
+                 serializes calls into a job directory on a (shared) filesystem
+                 from which they are executed by any number of consumers
+                 started via `python -m veer.spool consume <spool_dir>`.
+                 `subinterpreter` executes calls in reused PEP 734
+                 subinterpreters (Python 3.14+), `thread` in threads of the
+                 host (free-threaded builds only); both fall back to
+                 `subprocess` if unsupported. Arguments and return values are
+                 passed as pickled copies in all cases. As threads and
+                 subinterpreters cannot be killed, timed out calls keep
+                 running in the background.
+        spool_dir: job directory for the `spool` backend. If None,
+                   `spool.directory` (or VEER_SPOOL_DIR) is used.
+        single_flight: if True, concurrent calls with identical arguments
+                       (compared via the hash of their pickled form) share a
+                       single execution: all callers receive the same return
+                       value (not a copy) or the same RemoteError.
+        workers: if not None, calls are executed by up to this many long-lived
+                 children (per function) that execute one call after another
+                 instead of spawning a child per call.
+        max_calls_per_child: long-lived children are replaced after executing
+                             this many calls. If None,
+                             `workers.max_calls_per_child` is used.
+        max_rss: long-lived children are replaced once their resident set size
+                 exceeds this many bytes after a call. If None,
+                 `workers.max_rss` is used.
+        max_child_age: long-lived children are replaced once they are older
+                       than this many seconds. If None, `workers.max_age` is
+                       used.
+
         If they are not given, all RunInSubprocess-decorated functions can be
         run in a singularity container by setting VEER_SINGULARITY and
         specifying VEER_CONTAINER_IMAGE / VEER_CONTAINER_APP.
@@ -104,10 +241,56 @@ class Veerify(object):
         self._func_name = func.__name__
         self.__name__ = f"{self._func_name}.veerified"
         self._func_module = func.__module__
+        self._qualified_name = f"{self._func_module}.{self._func_name}"
 
         self._container_image = container_image
         self._container_app = container_app
         self._always_in_container = always_in_container
+        self._mmap_results = mmap_results
+        self._imports = imports
+        self._timeout = timeout
+        self._idempotent = idempotent
+        self._hedge_percentile = hedge_percentile
+        self._priority = get_priority(priority)
+        self._quota = quota
+        self._cpus = cpus
+        self._serializer = serializer
+        self._spool_dir = spool_dir
+        self._single_flight = single_flight
+        self._workers = workers
+        self._max_calls_per_child = max_calls_per_child
+        self._max_rss = max_rss
+        self._max_child_age = max_child_age
+
+        if backend not in ["subprocess", "spool", "subinterpreter", "thread"]:
+            raise ValueError(f"Unknown backend: {backend}")
+        self._backend = backends.get_effective_backend(backend)
+
+        if workers is not None and backend != "subprocess":
+            raise ValueError("Long-lived workers require the subprocess backend.")
+
+        if hedge_percentile is not None and not idempotent:
+            raise ValueError("Hedging requires the function to be idempotent.")
+
+        if cpus is not None and cpus < 1:
+            raise ValueError(f"Children need at least one CPU, got cpus={cpus}.")
+
+        self._stats = collections.Counter()
+        self._stats_lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=get_config("hedging.history"))
+        # maps argument hashes to the futures of in-flight calls
+        self._in_flight = {}
+        self._worker_pool = None
+        self._executor = None
+        self._interpreters = backends.InterpreterPool()
+        # guards lazily created worker pool and executor
+        self._resources_lock = threading.Lock()
+
+        # options that need to be known to the Veerify-instance in the child
+        self._client_options = {"mmap_results": mmap_results, "serializer": serializer}
+        # further directories to bind into containers (e.g., those of the stages
+        # of a fused pipeline)
+        self._extra_func_dirs = []
 
         try:
             self._func_dir = self._get_func_dir(self._func_module)
@@ -117,6 +300,23 @@ class Veerify(object):
                 "subprocess!"
             )
 
+    def _capture_call(self, recorder, call, args, kwargs, return_values):
+        """Record the payloads of a successful call (see `veer.capture`)."""
+        try:
+            # record the payloads as they are sent to the child
+            args, kwargs = objects.dereference(args, kwargs)
+            payloads = [
+                ("arguments", payload)
+                for payload in self._get_argument_payloads(args, kwargs)
+            ]
+            payloads.append(("result", return_values))
+            recorder.record(
+                self._qualified_name, call.id, payloads, preferred=self._serializer
+            )
+        except Exception as e:
+            # capturing must never fail the call
+            log.warning(f"Could not capture call of {self._func_name}: {e}")
+
     def _check_run_in_container(self):
         if self._always_in_container:
             return True
@@ -128,19 +328,122 @@ class Veerify(object):
             return True
 
     def _client(self, address_tpl):
+        tracing.record_startup()
         socket = self._setup_socket_client(address_tpl)
-        args, kwargs = self._recv_arguments(socket)
+        serializers = self._send_handshake(socket)
+        context = None
+        if tracing.enabled():
+            context = self._recv_trace_context(socket)
+
+        with tracing.span("recv", category="child"):
+            args, kwargs = self._recv_arguments(socket)
+
+        with tracing.span("run", category="child"):
+            return_value = self._execute_forwarding_logs(
+                args, kwargs, socket, serializers
+            )
+        with tracing.span("send", category="child"):
+            self._send_returnvalue(socket, return_value, serializers=serializers)
+
+        if context is not None:
+            self._send_trace(socket, context, serializers=serializers)
+
+    def _dispatch(self, args, kwargs):
+        if self._hedge_percentile is not None:
+            return self._host_hedged(args, kwargs)
+        else:
+            return self._host(args, kwargs)
+
+    def _execute(self, args, kwargs):
+        """Execute the wrapped function.
 
-        return_value = None
+        Returns:
+            The return value of the function or a RemoteError wrapping the
+            exception raised by it.
+        """
         try:
-            return_value = self._func(*args, **kwargs)
+            return self._func(*args, **kwargs)
         except Exception:
             wrapped = RemoteError()
             wrapped.wrap_exception()
-            # send etxception
-            self._send_returnvalue(socket, wrapped)
+            return wrapped
+
+    def _execute_forwarding_logs(self, args, kwargs, socket, serializers):
+        """Execute the wrapped function in the child while sending batches of
+        log records to the host (if enabled, see `veer.logforward`)."""
+        handler = logforward.get_handler()
+        if handler is None:
+            return self._execute(args, kwargs)
+
+        handler.start(socket, serializers=serializers)
+        try:
+            return self._execute(args, kwargs)
         finally:
-            self._send_returnvalue(socket, return_value)
+            handler.stop()
+
+    def _execute_inprocess(self, payload):
+        """Execute a call in a subinterpreter or thread (see `veer.backends`).
+
+        Returns:
+            Pickled return value or RemoteError.
+        """
+        if self._backend == "thread":
+            args, kwargs = pkl.loads(payload)
+            return backends.pickle_result(self._execute(args, kwargs))
+
+        interpreter = self._interpreters.acquire()
+        healthy = False
+        try:
+            result = interpreter.call(
+                backends.execute_pickled,
+                self._get_module_import_name(),
+                self._func_name,
+                self._func_dir,
+                payload,
+            )
+            healthy = True
+        finally:
+            self._interpreters.release(interpreter, healthy=healthy)
+        return result
+
+    def _get_argument_payloads(self, args, kwargs, serializers=None, objects=None):
+        """Get the objects that are sent (one after another) for the arguments
+        of a call (see `_send_arguments`)."""
+        args, kwargs, separate = serialization.split_arguments(
+            args, kwargs, serializers
+        )
+        # lists (rather than tuples) can be encoded by json and msgpack, the
+        # child turns the positional arguments back into a tuple
+        message = [list(args), kwargs]
+        if objects is not None:
+            message.extend(objects)
+        return [message] + separate
+
+    def _get_child_env(self, cpus=None, traced=False):
+        """Get the environment the child process is started with."""
+        env = {
+            "VEER_PARENT": str(os.getpid()),
+            "VEER_SERIALIZERS": serialization.format_available(
+                serialization.get_available()
+            ),
+        }
+        if traced:
+            # the child records spans and sends them after each call
+            env["VEER_TRACE"] = "1"
+        forward_level = logforward.get_forward_level()
+        if forward_level is not None:
+            env["VEER_LOG_FORWARD"] = str(forward_level)
+            env["VEER_LOG_BUFFER_SIZE"] = str(get_config("logging.buffer_size"))
+            env["VEER_LOG_FLUSH_INTERVAL"] = str(get_config("logging.flush_interval"))
+        if self._mmap_results:
+            # make sure the child writes to the same directory the host expects
+            env["VEER_SCRATCH_DIR"] = scratch.get_scratch_dir()
+        if cpus is not None:
+            # affinity is set in the child script, threads are limited via env
+            env["VEER_CPUS"] = placement.format_cpulist(cpus)
+            for variable in placement.THREAD_ENV_VARIABLES:
+                env[variable] = str(len(cpus))
+        return env
 
     def _get_container_args(self, script_filename):
         if self._container_image is None:
@@ -159,13 +462,18 @@ class Veerify(object):
         else:
             app = self._container_app
 
+        binds = []
+        for func_dir in dict.fromkeys([self._func_dir, *self._extra_func_dirs]):
+            binds.extend(["-B", func_dir])
+        if self._mmap_results:
+            binds.extend(["-B", scratch.get_scratch_dir()])
+
         return [
             self._get_container_binary(),
             "exec",
             "--app",
             app,
-            "-B",
-            self._func_dir,
+            *binds,
             container,
             get_config("python.binary"),
             script_filename,
@@ -174,12 +482,20 @@ class Veerify(object):
     def _get_container_binary(self):
         from_config = get_config("singularity.binary")
 
-        in_system = ds.find_executable(from_config)
+        in_system = shutil.which(from_config)
 
         if in_system is None:
             raise OSError(f"Could not find singularity executable: {from_config}")
         return in_system
 
+    def _get_executor(self):
+        with self._resources_lock:
+            if self._executor is None:
+                self._executor = cf.ThreadPoolExecutor(
+                    thread_name_prefix=f"veer-{self._func_name}"
+                )
+            return self._executor
+
     def _get_func_dir(self, module_name):
         """Get the toplevel-directory of the module so that the import works in
         the submodule."""
@@ -206,6 +522,35 @@ class Veerify(object):
         log.debug(f"func_dir: {func_dir}")
         return func_dir
 
+    def _get_call_key(self, args, kwargs):
+        """Get the key identifying identical calls or None if the arguments
+        cannot be pickled."""
+        try:
+            pickled = pkl.dumps((args, kwargs), protocol=pkl.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+        return hashlib.sha256(pickled).digest()
+
+    def _get_hedge_delay(self):
+        """Get the time after which a call is hedged or None if there are not
+        enough samples yet."""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+
+        if len(latencies) < get_config("hedging.min_samples"):
+            return None
+
+        index = math.ceil(self._hedge_percentile / 100 * len(latencies)) - 1
+        return latencies[min(max(index, 0), len(latencies) - 1)]
+
+    def _get_import_statements(self):
+        for entry in self._imports:
+            entry = entry.strip()
+            if entry.startswith("import ") or entry.startswith("from "):
+                yield entry
+            else:
+                yield f"import {entry}"
+
     def _get_module_import_name(self):
         if self._func_module != "__main__":
             return self._func_module
@@ -214,42 +559,475 @@ class Veerify(object):
             module_path = osp.basename(module_path)
             return osp.splitext(module_path)[0]
 
-    def _host(self, *args, **kwargs):
-        script_filename = None
-        return_values = None
-        process = None
+    def _get_num_cpus(self):
+        if self._cpus is not None:
+            return self._cpus
+        num_cpus = get_config("placement.cpus_per_child")
+        if num_cpus is not None and int(num_cpus) < 1:
+            raise ValueError(
+                "Children need at least one CPU, got placement.cpus_per_child="
+                f"{num_cpus}."
+            )
+        return num_cpus
+
+    def _get_slim_source(self):
+        """Get the source of the wrapped function without any decorators."""
+        source = textwrap.dedent(inspect.getsource(self._func))
+        func_def = ast.parse(source).body[0]
+        lines = source.splitlines(keepends=True)
+        # before Python 3.8, lineno points to the first decorator instead
+        start = func_def.lineno - 1
+        if func_def.decorator_list:
+            while not lines[start].startswith(("def ", "async def ")):
+                start += 1
+        return "".join(lines[start:]) + "\n"
+
+    def _get_worker_pool(self):
+        with self._resources_lock:
+            if self._worker_pool is None:
+                from .worker import WorkerPool
+
+                self._worker_pool = WorkerPool(
+                    self,
+                    self._workers,
+                    max_calls_per_child=self._max_calls_per_child,
+                    max_rss=self._max_rss,
+                    max_age=self._max_child_age,
+                )
+                atexit.register(self._worker_pool.close)
+            return self._worker_pool
+
+    def _host(self, args, kwargs, call=None, deadline=None):
+        if call is None:
+            call = _Call()
+
+        if deadline is None and self._timeout is not None:
+            deadline = time.monotonic() + self._timeout
+
+        watchdog = None
+        if deadline is not None:
+            watchdog = threading.Timer(
+                max(deadline - time.monotonic(), 0.0), call.abort, args=("timeout",)
+            )
+            watchdog.daemon = True
+            watchdog.start()
+
+        metrics.autostart()
+
+        start = time.monotonic()
+        outcome = "error"
+        with tracing.span("call", function=self._qualified_name, call_id=call.id):
+            try:
+                if self._backend == "spool":
+                    return_values = self._host_spool(args, kwargs, call)
+                elif self._backend in ["subinterpreter", "thread"]:
+                    return_values = self._host_inprocess(args, kwargs, call, deadline)
+                else:
+                    return_values = self._host_subprocess(args, kwargs, call, deadline)
+            except RemoteError:
+                outcome = "remote_error"
+                raise
+            except RemoteTimeoutError:
+                # timed out waiting for a free slot
+                outcome = "timeout"
+                with self._stats_lock:
+                    self._stats["timeouts"] += 1
+                raise
+            except Exception as e:
+                if call.aborted == "timeout":
+                    outcome = "timeout"
+                    with self._stats_lock:
+                        self._stats["timeouts"] += 1
+                    raise RemoteTimeoutError(
+                        f"{self._func_name} did not finish within {self._timeout}s."
+                    ) from e
+                elif call.aborted == "cancelled":
+                    # the other execution of a hedged call finished first
+                    outcome = "cancelled"
+                raise
+            else:
+                outcome = "success"
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+                with self._stats_lock:
+                    self._stats.update(call.stats)
+                metrics.calls.inc(function=self._qualified_name, outcome=outcome)
+                if call.stats["queue_wait_seconds"] > 0:
+                    metrics.queue_wait.inc(
+                        call.stats["queue_wait_seconds"], function=self._qualified_name
+                    )
+
+        # queue-wait is reported separately
+        latency = time.monotonic() - start - call.stats["queue_wait_seconds"]
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            self._latencies.append(latency)
+        metrics.call_duration.observe(latency, function=self._qualified_name)
+
+        recorder = capture.get_capture()
+        if recorder is not None and recorder.should_sample():
+            self._capture_call(recorder, call, args, kwargs, return_values)
+
+        return return_values
+
+    def _host_hedged(self, args, kwargs):
+        """Execute the call and launch a duplicate if it takes longer than the
+        configured percentile of previous latencies. The first execution that
+        finishes is used, the other one is cancelled."""
+        deadline = None
+        if self._timeout is not None:
+            deadline = time.monotonic() + self._timeout
+
+        delay = self._get_hedge_delay()
+        if delay is None:
+            return self._host(args, kwargs, deadline=deadline)
+
+        executor = cf.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix=f"veer-{self._func_name}"
+        )
         try:
-            socket, address, port = self._setup_socket_host()
-            script_filename = self._setup_script_file(address, port)
+            primary = _Call()
+            calls = {
+                executor.submit(self._host, args, kwargs, primary, deadline): primary
+            }
+
+            done, _ = cf.wait(calls, timeout=delay)
+            if not done:
+                log.debug(f"Hedging call to {self._func_name} after {delay:.3f}s.")
+                hedge = _Call()
+                future = executor.submit(self._host, args, kwargs, hedge, deadline)
+                calls[future] = hedge
+                with self._stats_lock:
+                    self._stats["hedges_launched"] += 1
+                metrics.hedges_launched.inc(function=self._qualified_name)
+
+            winner = None
+            pending = set(calls)
+            while winner is None:
+                done, pending = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+                for future in done:
+                    error = future.exception()
+                    # errors raised by the function itself are final, all other
+                    # errors (e.g., failing to spawn) leave room for the other
+                    # execution to succeed
+                    if error is None or isinstance(error, RemoteError) or not pending:
+                        winner = future
+                        break
+
+            for future in pending:
+                calls[future].abort("cancelled")
+
+            if calls[winner] is not primary:
+                with self._stats_lock:
+                    self._stats["hedges_won"] += 1
+                metrics.hedges_won.inc(function=self._qualified_name)
+
+            return winner.result()
+        finally:
+            executor.shutdown(wait=False)
 
-            # allow a single connection only
-            socket.listen(1)
+    def _host_inprocess(self, args, kwargs, call, deadline):
+        args, kwargs = objects.dereference(args, kwargs)
+        payload = pkl.dumps((args, kwargs), protocol=pkl.HIGHEST_PROTOCOL)
+        call.stats["bytes_sent"] += len(payload)
 
-            process = self._spawn_process(script_filename)
+        timeout = None
+        if deadline is not None:
+            timeout = max(deadline - time.monotonic(), 0.0)
+        future = self._get_executor().submit(self._execute_inprocess, payload)
+        try:
+            result = future.result(timeout=timeout)
+        except cf.TimeoutError:
+            raise RemoteTimeoutError(
+                f"{self._func_name} did not finish within {self._timeout}s."
+            )
+        call.stats["bytes_received"] += len(result)
 
-            conn, client_address = socket.accept()
+        retval = pkl.loads(result)
+        if isinstance(retval, RemoteError):
+            retval.write_to_log()
+            raise retval
+        return retval
 
-            self._send_arguments(conn, args, kwargs)
-            return_values = self._recv_returnvalue(conn)
+    def _host_single_flight(self, args, kwargs):
+        """Execute the call unless an identical call is already in flight, in
+        which case its outcome is awaited instead."""
+        key = self._get_call_key(args, kwargs)
+        if key is None:
+            log.debug(f"Not deduplicating unpicklable call of {self._func_name}.")
+            return self._dispatch(args, kwargs)
+
+        with self._stats_lock:
+            future = self._in_flight.get(key, None)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = cf.Future()
+            else:
+                self._stats["single_flight_hits"] += 1
+
+        if not leader:
+            metrics.single_flight_hits.inc(function=self._qualified_name)
+            return future.result()
 
-            process.wait()
+        try:
+            future.set_result(self._dispatch(args, kwargs))
+        except BaseException as e:
+            future.set_exception(e)
         finally:
-            if process is not None and process.poll() is None:
-                process.kill()
-            if script_filename is not None:
-                util.delete_script_file(script_filename)
-            socket.close()
+            with self._stats_lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def _host_spool(self, args, kwargs, call):
+        # imported here so that `python -m veer.spool` does not find the module
+        # imported already
+        from . import spool
+
+        args, kwargs = objects.dereference(args, kwargs)
+
+        spool_dir = self._spool_dir
+        if spool_dir is None:
+            spool_dir = spool.get_spool_dir()
+        queue = spool.Spool(spool_dir)
+
+        job_id = queue.submit(
+            {
+                "module": self._get_module_import_name(),
+                "function": self._func_name,
+                "func_dir": self._func_dir,
+                # pickled separately so that consumers can make the function's
+                # module importable before loading the arguments
+                "arguments": pkl.dumps((args, kwargs), protocol=pkl.DEFAULT_PROTOCOL),
+            }
+        )
+        done = False
+        try:
+            while True:
+                if call.aborted is not None:
+                    raise RuntimeError(f"Call was aborted: {call.aborted}")
+                try:
+                    retval = queue.get_result(job_id)
+                except FileNotFoundError:
+                    time.sleep(queue.poll_interval)
+                    continue
+                done = True
+                break
+        finally:
+            if not done:
+                queue.cancel(job_id)
+
+        if isinstance(retval, RemoteError):
+            retval.write_to_log()
+            raise retval
+
+        return retval
+
+    def _host_subprocess(self, args, kwargs, call, deadline):
+        if self._workers is not None:
+            return self._host_worker(args, kwargs, call, deadline)
+
+        # only long-lived children keep objects
+        args, kwargs = objects.dereference(args, kwargs)
+
+        child = self._start_child(call=call, deadline=deadline)
+        try:
+            with tracing.span("send", call_id=call.id):
+                if child.traced:
+                    self._send_trace_context(child, call)
+                self._send_arguments(
+                    child.conn,
+                    args,
+                    kwargs,
+                    serializers=child.serializers,
+                    stats=call.stats,
+                )
+            return_values = self._recv_returnvalue(
+                child.conn, stats=call.stats, call=call
+            )
+
+            call.process.wait()
+        finally:
+            call.cleanup()
+            child.release()
+
+        return return_values
+
+    def _host_worker(self, args, kwargs, call, deadline):
+        timeout = None
+        if deadline is not None:
+            timeout = max(deadline - time.monotonic(), 0.0)
+        pool = self._get_worker_pool()
+        with tracing.span("acquire", call_id=call.id):
+            child = pool.acquire(timeout=timeout)
+
+        healthy = False
+        try:
+            call.set_process(child.process)
+            call.add_socket(child.conn)
+
+            args, kwargs, store, evict = child.objects.prepare(
+                args, kwargs, stats=call.stats
+            )
+            with tracing.span("send", call_id=call.id):
+                if child.traced:
+                    self._send_trace_context(child, call)
+                self._send_arguments(
+                    child.conn,
+                    args,
+                    kwargs,
+                    serializers=child.serializers,
+                    stats=call.stats,
+                    objects=(store, evict),
+                )
+            child.rss = self._recv_status(child.conn, call=call)["rss"]
+            child.calls += 1
+            try:
+                return_values = self._recv_returnvalue(
+                    child.conn, stats=call.stats, call=call
+                )
+            except RemoteError:
+                # errors raised by the function leave the child intact
+                healthy = call.aborted is None
+                raise
+            healthy = call.aborted is None
+        finally:
+            pool.release(child, healthy=healthy)
 
         return return_values
 
+    def get_stats(self):
+        """Get statistics about the calls of this function.
+
+        Returns:
+            Dictionary containing the number of successful `calls`, `timeouts`,
+            launched hedges (`hedges_launched`), how many of them finished
+            before the original execution (`hedges_won`), how many calls were
+            served by an identical call in flight (`single_flight_hits`), how
+            many long-lived children were replaced (`recycles`), how many
+            large arguments were already held by long-lived children
+            (`object_hits`) or had to be sent (`object_misses`) and the total
+            time spent waiting for a free slot in the scheduler
+            (`queue_wait_seconds`). Furthermore, the number of transferred
+            bytes (`bytes_sent`, `bytes_received`) and how many payloads were
+            sent to the child (`serializer_<name>`) and received from it
+            (`received_serializer_<name>`) with each serializer.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        for key in [
+            "calls",
+            "timeouts",
+            "hedges_launched",
+            "hedges_won",
+            "single_flight_hits",
+            "recycles",
+            "object_hits",
+            "object_misses",
+            "bytes_sent",
+            "bytes_received",
+        ]:
+            stats.setdefault(key, 0)
+        stats.setdefault("queue_wait_seconds", 0.0)
+        return stats
+
+    def map_array(
+        self,
+        array,
+        *args,
+        axis=0,
+        chunks=None,
+        reduce="concatenate",
+        out=None,
+        **kwargs,
+    ):
+        """Split a numpy array into chunks and execute the function on each
+        chunk in a separate child.
+
+        The array is shared with the children via a memory-mapped file in
+        shared memory (`/dev/shm`), each child maps only its chunk
+        (copy-on-write). Results are combined on the host as chunks complete.
+
+        Args:
+            array: Array to split.
+
+            args: Further positional arguments passed to each call after the
+                  chunk.
+
+            axis: Axis along which the array is split.
+
+            chunks: Number of chunks (default: number of available CPUs).
+
+            reduce: How results are combined: `concatenate` (along `axis`,
+                    results of the same length as their chunk are written to
+                    a preallocated output), `sum` or a callable combining two
+                    results (applied in completion order, i.e., it should be
+                    associative and commutative).
+
+            out: Optional preallocated output array (`concatenate`, `sum`).
+
+            kwargs: Further keyword arguments passed to each call.
+
+        Returns:
+            Combined results of all chunks.
+        """
+        from .arrays import map_array
+
+        return map_array(
+            self,
+            array,
+            *args,
+            axis=axis,
+            chunks=chunks,
+            reduce=reduce,
+            out=out,
+            **kwargs,
+        )
+
     def _recv_arguments(self, socket):
         log.debug("Receiving arguments.")
         args, kwargs = util.recv_object(socket)
-        return args, kwargs
+        return self._recv_separate_arguments(socket, args, kwargs)
+
+    def _recv_separate_arguments(self, socket, args, kwargs):
+        """Receive the arguments sent separately by `_send_arguments`."""
+        return serialization.join_arguments(
+            args, kwargs, lambda: util.recv_object(socket)
+        )
+
+    def _recv_handshake(self, socket):
+        """Receive the serializers available in the child.
+
+        Returns:
+            Dictionary of serializers that can be used with the child.
+        """
+        peer = util.recv_object(socket)
+        return serialization.negotiate(serialization.get_available(), peer)
 
-    def _recv_returnvalue(self, socket):
+    def _recv_returnvalue(self, socket, stats=None, call=None):
+        """Receive the return value of a call.
+
+        Args:
+            call: If given and a trace context was sent for it, the child's
+                  trace events are received as well.
+        """
         log.debug("Receiving return value.")
-        retval = util.recv_object(socket)
+        if tracing.enabled():
+            call_id = call.id if call is not None else None
+            with tracing.span("wait", call_id=call_id):
+                # blocks until the child starts sending
+                socket.recv(1, skt.MSG_PEEK)
+            with tracing.span("recv", call_id=call_id):
+                retval = self._recv_reply(socket, stats=stats, call=call)
+        else:
+            retval = self._recv_reply(socket, stats=stats, call=call)
+
+        if isinstance(retval, scratch.MappedResult):
+            # map (and thereby remove) the file before anything else can fail
+            retval = retval.load()
+
+        if call is not None and call.trace_sent is not None:
+            self._recv_trace(socket, call)
 
         if isinstance(retval, RemoteError):
             # make sure the remote information is available to the host
@@ -260,15 +1038,150 @@ class Veerify(object):
 
         return retval
 
-    def _send_arguments(self, socket, args, kwargs):
+    def _recv_trace(self, socket, call):
+        """Receive the events the child recorded during the call."""
+        report = util.recv_object(socket)
+        tracing.add_child_report(
+            report, call.trace_sent, f"veer child {self._qualified_name}"
+        )
+
+    def _recv_trace_context(self, socket):
+        """Receive the trace context of the next call (child only)."""
+        context = util.recv_object(socket)
+        context["received"] = tracing.now_us()
+        return context
+
+    def _recv_reply(self, socket, stats=None, call=None):
+        """Receive the next reply of the child, re-emitting all batches of log
+        records sent before it (see `veer.logforward`)."""
+        while True:
+            reply = util.recv_object(socket, stats=stats)
+            if not isinstance(reply, logforward.LogBatch):
+                return reply
+            logforward.emit_batch(
+                reply,
+                call_id=call.id if call is not None else None,
+                child_pid=call.process.pid if call is not None else None,
+            )
+
+    def _recv_status(self, socket, call=None):
+        """Receive the status a long-lived child reports after each call."""
+        return self._recv_reply(socket, call=call)
+
+    def _send_arguments(
+        self, socket, args, kwargs, serializers=None, stats=None, objects=None
+    ):
+        """Send the arguments of a call.
+
+        Arguments with a serializer registered for their type (see
+        `serialization.set_type_serializer`) are sent separately after the
+        others so that they are encoded with it.
+
+        Args:
+            objects: Tuple of objects to store and digests to evict (see
+                     `objects.ObjectCache.prepare`), only for long-lived
+                     children.
+        """
         log.debug("Sending arguments.")
-        util.send_object(socket, (args, kwargs))
+        for obj in self._get_argument_payloads(args, kwargs, serializers, objects):
+            util.send_object(
+                socket,
+                obj,
+                serializers=serializers,
+                preferred=self._serializer,
+                stats=stats,
+            )
+
+    def _send_handshake(self, socket):
+        """Send the serializers available in the child to the host.
+
+        Returns:
+            Dictionary of serializers that can be used with the host.
+        """
+        own = serialization.get_available()
+        util.send_object(socket, own, serializers={"json": 1}, preferred="json")
+
+        # the host passes its serializers via environment
+        peer = os.environ.get("VEER_SERIALIZERS", f"pickle={pkl.DEFAULT_PROTOCOL}")
+        return serialization.negotiate(own, serialization.parse_available(peer))
+
+    def _send_returnvalue(self, socket, retval, serializers=None):
+        if self._mmap_results and scratch.is_mappable(retval):
+            log.debug("Writing return value to scratch directory.")
+            retval = scratch.MappedResult.dump(retval)
 
-    def _send_returnvalue(self, socket, retval):
         log.debug("Sending return value.")
-        util.send_object(socket, retval)
+        util.send_object(
+            socket, retval, serializers=serializers, preferred=self._serializer
+        )
+
+    def _send_trace(self, socket, context, serializers=None):
+        """Send the events recorded during a call to the host (child only)."""
+        util.send_object(
+            socket,
+            tracing.get_child_report(context),
+            serializers=serializers,
+            preferred="json",
+        )
+
+    def _send_trace_context(self, child, call):
+        """Send the trace context of a call, the host time it is sent at is
+        used to align the child's clock."""
+        call.trace_sent = tracing.now_us()
+        util.send_object(
+            child.conn,
+            {"call_id": call.id},
+            serializers=child.serializers,
+            preferred="json",
+        )
 
-    def _setup_script_file(self, address, port):
+    def _send_status(self, socket, serializers=None):
+        util.send_object(
+            socket, {"rss": util.get_rss()}, serializers=serializers, preferred="json"
+        )
+
+    def _serve(self, address_tpl):
+        """Execute calls received from the host until it asks the child to
+        exit (long-lived children only)."""
+        tracing.record_startup()
+        socket = self._setup_socket_client(address_tpl)
+        serializers = self._send_handshake(socket)
+
+        while True:
+            try:
+                message = util.recv_object(socket)
+            except RuntimeError:
+                log.debug("Host disconnected.")
+                break
+            if message is None:
+                log.debug("Retired by host.")
+                break
+
+            context = None
+            if tracing.enabled():
+                # the trace context precedes the arguments
+                context = message
+                context["received"] = tracing.now_us()
+                message = util.recv_object(socket)
+
+            with tracing.span("recv", category="child"):
+                args, kwargs, store, evict = message
+                args, kwargs = self._recv_separate_arguments(socket, args, kwargs)
+                objects.update_store(store, evict)
+                args, kwargs = objects.resolve(args, kwargs)
+
+            with tracing.span("run", category="child"):
+                return_value = self._execute_forwarding_logs(
+                    args, kwargs, socket, serializers
+                )
+            self._send_status(socket, serializers=serializers)
+            with tracing.span("send", category="child"):
+                self._send_returnvalue(socket, return_value, serializers=serializers)
+
+            if context is not None:
+                self._send_trace(socket, context, serializers=serializers)
+
+    def _setup_script_file(self, address, port, persistent=False):
         script = tempfile.NamedTemporaryFile(
             prefix="veer_", suffix=".py", mode="w", delete=False
         )
@@ -278,15 +1191,45 @@ class Veerify(object):
         script.write(f"#!{sys.executable}\n")
         script.write("# encoding: utf-8\n")
         script.write("import sys, os\n")
+        # launchers that cannot set the working directory pass it via env
+        script.write("if 'VEER_CWD' in os.environ:\n")
+        script.write("    os.chdir(os.environ['VEER_CWD'])\n")
         script.write("sys.path.append(os.getcwd())\n")
 
-        # import the needed module
-        script.write(f"import {self._get_module_import_name()} as target_module\n")
+        # start of the child as seen by the tracer (see `tracing.record_startup`)
+        script.write("if 'VEER_TRACE' in os.environ:\n")
+        script.write("    import time\n")
+        script.write("    os.environ['VEER_TRACE_START'] = str(time.monotonic_ns())\n")
+
+        # pin the child before anything else is imported or started
+        script.write("if 'VEER_CPUS' in os.environ:\n")
+        script.write("    veer_cpus = map(int, os.environ['VEER_CPUS'].split(','))\n")
+        script.write("    os.sched_setaffinity(0, veer_cpus)\n")
+
+        if self._imports is None:
+            # import the needed module
+            script.write(f"import {self._get_module_import_name()} as target_module\n")
+            target = f"target_module.{self._func_name}"
+            module = sys.modules.get(self._func_module, None)
+            if getattr(module, self._func_name, None) is not self:
+                # this instance is not the one the child imports (e.g., stages
+                # of a pipeline fused with further options) -> pass on options
+                script.write("import veer.core\n")
+                target = (
+                    f"veer.core.Veerify(getattr({target}, '_func', {target}), "
+                    f"**{self._client_options!r})"
+                )
+        else:
+            # only import what is needed and define the function from source
+            script.write("import veer.core\n")
+            for statement in self._get_import_statements():
+                script.write(f"{statement}\n")
+            script.write(self._get_slim_source())
+            target = f"veer.core.Veerify({self._func_name}, **{self._client_options!r})"
 
         # execute the client subfunction with the passed address
-        script.write(
-            f"target_module.{self._func_name}._client(('{address}', {port}))\n"
-        )
+        entry_point = "_serve" if persistent else "_client"
+        script.write(f"{target}.{entry_point}(('{address}', {port}))\n")
 
         script.close()
 
@@ -299,6 +1242,9 @@ class Veerify(object):
         log.debug("Setting up client socket..")
 
         socket = skt.socket(skt.AF_INET, skt.SOCK_STREAM)
+        # the protocol consists of small messages answered by sync tokens,
+        # which Nagle's algorithm would delay until the peer's delayed ACK
+        socket.setsockopt(skt.IPPROTO_TCP, skt.TCP_NODELAY, 1)
         socket.connect(address_tpl)
 
         return socket
@@ -311,7 +1257,7 @@ class Veerify(object):
             log.debug(f"Set up host socket on {address}:{port}.")
         return socket, address, port
 
-    def _spawn_process(self, script_filename):
+    def _spawn_process(self, script_filename, cpus=None, traced=False):
         if self._check_run_in_container():
             log.debug("Spawning subprocess in container..")
             args = self._get_container_args(script_filename)
@@ -319,4 +1265,202 @@ class Veerify(object):
             log.debug("Spawning in subprocess..")
             args = [sys.executable, script_filename]
 
-        return sp.Popen(args, cwd=self._func_dir, env={"VEER_PARENT": str(os.getpid())})
+        # starts a new session so that the whole process tree can be killed
+        # the script changes to the working directory itself (see above)
+        return launcher.launch(
+            args,
+            cwd=self._func_dir,
+            env=self._get_child_env(cpus=cpus, traced=traced),
+            cwd_from_env=True,
+        )
+
+    def _start_child(self, call=None, deadline=None, persistent=False):
+        """Acquire a slot and CPUs, spawn a child and wait for its handshake.
+
+        Args:
+            call: If given, _Call-instance the child is registered with so that
+                  the startup can be aborted.
+
+            deadline: Time (as returned by `time.monotonic`) until which a
+                      slot must have been acquired.
+
+            persistent: If True, the child executes calls until it is asked to
+                        exit (see `_serve`).
+
+        Returns:
+            _Child-instance describing the connected child.
+        """
+        child = _Child(self._qualified_name)
+        call_id = call.id if call is not None else None
+        try:
+            slot_timeout = None
+            if deadline is not None:
+                slot_timeout = max(deadline - time.monotonic(), 0.0)
+            with tracing.span("queue", call_id=call_id):
+                queue_wait = get_scheduler().acquire(
+                    self._qualified_name,
+                    priority=self._priority,
+                    quota=self._quota,
+                    timeout=slot_timeout,
+                )
+            child.slot_acquired = True
+            if call is not None:
+                call.stats["queue_wait_seconds"] += queue_wait
+
+            num_cpus = self._get_num_cpus()
+            if num_cpus is not None:
+                child.cpus = placement.get_allocator().allocate(num_cpus)
+
+            socket, address, port = self._setup_socket_host()
+            child.sockets.append(socket)
+            if call is not None:
+                call.add_socket(socket)
+
+            # decided once so that host and child agree on the protocol
+            child.traced = tracing.enabled()
+            with tracing.span("spawn", call_id=call_id):
+                child.script_filename = self._setup_script_file(
+                    address, port, persistent=persistent
+                )
+
+                # allow a single connection only
+                socket.listen(1)
+
+                try:
+                    process = self._spawn_process(
+                        child.script_filename, cpus=child.cpus, traced=child.traced
+                    )
+                except Exception:
+                    metrics.spawn_failures.inc(function=self._qualified_name)
+                    raise
+            metrics.children_spawned.inc(function=self._qualified_name)
+            metrics.children_live.inc()
+            child.process = process
+            if call is not None:
+                call.set_process(process)
+
+            with tracing.span("accept", call_id=call_id, pid=process.pid):
+                conn, client_address = socket.accept()
+                conn.setsockopt(skt.IPPROTO_TCP, skt.TCP_NODELAY, 1)
+                child.conn = conn
+                child.sockets.append(conn)
+                if call is not None:
+                    call.add_socket(conn)
+
+                child.serializers = self._recv_handshake(conn)
+        except BaseException:
+            child.release()
+            raise
+        child.started = time.monotonic()
+        return child
+
+
+class _Call(object):
+    """Resources of a single call on the host side so that the call can be
+    aborted from another thread (e.g., on timeout or cancellation)."""
+
+    def __init__(self):
+        self.aborted = None
+        self.id = next(_call_ids)
+        self.process = None
+        self.stats = collections.Counter()
+        self.trace_sent = None
+        self._sockets = []
+        self._lock = threading.Lock()
+
+    def abort(self, reason):
+        """Abort the call by killing the child and shutting down all sockets so
+        that blocking operations on the host return.
+
+        Args:
+            reason: String describing why the call is aborted.
+        """
+        with self._lock:
+            if self.aborted is not None:
+                return
+            self.aborted = reason
+            process = self.process
+            sockets = list(self._sockets)
+
+        if reason == "timeout":
+            log.warning("Call timed out, killing child.")
+        else:
+            log.debug(f"Aborting call: {reason}")
+
+        if process is not None:
+            self._kill(process)
+        for socket in sockets:
+            try:
+                socket.shutdown(skt.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def add_socket(self, socket):
+        with self._lock:
+            self._sockets.append(socket)
+            aborted = self.aborted is not None
+        if aborted:
+            raise RuntimeError(f"Call was aborted: {self.aborted}")
+
+    def cleanup(self):
+        """Kill the child (if still running) and close all sockets."""
+        with self._lock:
+            process = self.process
+            sockets, self._sockets = self._sockets, []
+
+        if process is not None and process.poll() is None:
+            self._kill(process)
+        for socket in sockets:
+            socket.close()
+
+    def _kill(self, process):
+        util.kill_process_tree(process)
+        # the child may have written its result without sending it
+        scratch.remove_results(process.pid)
+
+    def set_process(self, process):
+        with self._lock:
+            self.process = process
+            aborted = self.aborted is not None
+        if aborted:
+            util.kill_process_tree(process)
+            raise RuntimeError(f"Call was aborted: {self.aborted}")
+
+
+class _Child(object):
+    """Resources of a child on the host side."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.conn = None
+        self.cpus = None
+        self.objects = objects.ObjectCache()
+        self.process = None
+        self.rss = None
+        self.script_filename = None
+        self.serializers = None
+        self.slot_acquired = False
+        self.sockets = []
+        self.started = time.monotonic()
+        self.traced = False
+
+    def release(self):
+        """Kill the child (if still running) and free all its resources."""
+        if self.process is not None:
+            if self.process.poll() is None:
+                util.kill_process_tree(self.process)
+            metrics.children_live.dec()
+            self.process = None
+        for socket in self.sockets:
+            socket.close()
+        self.sockets = []
+        if self.script_filename is not None:
+            util.delete_script_file(self.script_filename)
+            self.script_filename = None
+        if self.cpus is not None:
+            placement.get_allocator().release(self.cpus)
+            self.cpus = None
+        if self.slot_acquired:
+            get_scheduler().release(self.name)
+            self.slot_acquired = False
@@ -3,6 +3,7 @@
 
 __all__ = [
     "RemoteError",
+    "RemoteTimeoutError",
 ]
 
 import itertools as it
@@ -39,3 +40,7 @@ class RemoteError(Exception):
 
     def __str__(self):
         return f"RemoteError wrapping {self.original_error_name}: {self.original_error_message}"
+
+
+class RemoteTimeoutError(TimeoutError):
+    "Raised if a remote call did not finish within its timeout."
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Start child processes in a new session.
+
+Two methods are available (`launcher.method`):
+* `popen`: `subprocess.Popen`, which closes all inherited file descriptors in
+  the child and may fall back to `fork` (copying the host's page tables).
+* `posix_spawn`: `os.posix_spawn`, which glibc implements via
+  `clone(CLONE_VM | CLONE_VFORK)`, so that the launch time does not grow with
+  the host's memory footprint. Descriptors that were made inheritable (e.g.,
+  via `os.set_inheritable` or `pass_fds` elsewhere) are closed in the child,
+  same as `popen` does. As posix_spawn cannot change the working directory, it
+  is passed via VEER_CWD and has to be changed to by the started process itself
+  (as the child script does). Processes that do not do so (`cwd_from_env`) are
+  started via `popen` unless they run in the host's working directory anyway.
+"""
+
+__all__ = [
+    "METHODS",
+    "SpawnedProcess",
+    "get_launch_method",
+    "launch",
+]
+
+import logging
+import os
+import subprocess as sp
+import threading
+import time
+
+from .config import get_config
+
+log = logging.getLogger(__name__)
+
+METHODS = ["popen", "posix_spawn"]
+
+
+def get_launch_method(method=None):
+    """Get the launch method to use.
+
+    Args:
+        method: Requested method. If None, `launcher.method` is used.
+
+    Returns:
+        `method` if available on this platform, `popen` otherwise.
+    """
+    if method is None:
+        method = get_config("launcher.method")
+    if method not in METHODS:
+        raise ValueError(f"Unknown launch method {method}, choose from: {METHODS}")
+    if method == "posix_spawn" and not hasattr(os, "posix_spawn"):
+        log.debug("posix_spawn not available, falling back to popen.")
+        return "popen"
+    return method
+
+
+def launch(args, cwd, env, method=None, cwd_from_env=False):
+    """Start a process in a new session (so that its whole process tree can be
+    killed via `util.kill_process_tree`).
+
+    Args:
+        args: List of the executable (absolute path) and its arguments.
+
+        cwd: Working directory of the process (for `posix_spawn`, only set via
+             VEER_CWD, see `cwd_from_env`).
+
+        env: Dictionary describing the complete environment of the process.
+
+        method: Launch method (see `get_launch_method`).
+
+        cwd_from_env: Whether the process changes to VEER_CWD itself. If False,
+                      `posix_spawn` is only used if `cwd` is the host's working
+                      directory.
+
+    Returns:
+        subprocess.Popen- or SpawnedProcess-instance.
+    """
+    fds = None
+    if get_launch_method(method) == "posix_spawn":
+        if cwd_from_env or _is_cwd(cwd):
+            fds = _get_inheritable_fds()
+            if fds is None:
+                log.debug("Cannot list open descriptors, falling back to popen.")
+        else:
+            log.debug("posix_spawn cannot change the working directory, using popen.")
+
+    if fds is not None:
+        # same as subprocess.Popen's close_fds
+        file_actions = [(os.POSIX_SPAWN_CLOSE, fd) for fd in fds]
+        try:
+            pid = os.posix_spawn(
+                args[0],
+                args,
+                dict(env, VEER_CWD=cwd),
+                file_actions=file_actions,
+                setsid=True,
+            )
+            return SpawnedProcess(pid, args)
+        except NotImplementedError:
+            # setsid requires glibc >= 2.26
+            log.debug("posix_spawn cannot start new sessions, falling back to popen.")
+
+    return sp.Popen(args, cwd=cwd, env=env, start_new_session=True)
+
+
+def _get_inheritable_fds():
+    """Get all inheritable file descriptors besides stdin, stdout and stderr or
+    None if the open descriptors cannot be listed."""
+    for fd_dir in ["/proc/self/fd", "/dev/fd"]:
+        try:
+            fds = [int(fd) for fd in os.listdir(fd_dir)]
+            break
+        except OSError:
+            continue
+    else:
+        return None
+
+    inheritable = []
+    for fd in fds:
+        if fd <= 2:
+            continue
+        try:
+            if os.get_inheritable(fd):
+                inheritable.append(fd)
+        except OSError:
+            # closed in the meantime (e.g., the one used for listing)
+            pass
+    return inheritable
+
+
+def _is_cwd(path):
+    try:
+        return os.path.samefile(path, os.getcwd())
+    except OSError:
+        return False
+
+
+class SpawnedProcess(object):
+    """Minimal `subprocess.Popen`-like handle of a process started via
+    `os.posix_spawn`."""
+
+    def __init__(self, pid, args):
+        self.args = args
+        self.pid = pid
+        self.returncode = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Get the exit code or None if the process is still running."""
+        if self.returncode is None and self._lock.acquire(blocking=False):
+            try:
+                self._wait(os.WNOHANG)
+            finally:
+                self._lock.release()
+        return self.returncode
+
+    def wait(self, timeout=None):
+        """Wait for the process to exit.
+
+        Raises:
+            subprocess.TimeoutExpired if it did not exit within `timeout`.
+        """
+        if timeout is None:
+            with self._lock:
+                self._wait(0)
+            return self.returncode
+
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while self.poll() is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise sp.TimeoutExpired(self.args, timeout)
+            delay = min(delay * 2, remaining, 0.05)
+            time.sleep(delay)
+        return self.returncode
+
+    def _wait(self, options):
+        # must be called with self._lock held
+        if self.returncode is not None:
+            return
+        try:
+            pid, status = os.waitpid(self.pid, options)
+        except ChildProcessError:
+            # reaped elsewhere, the exit code is lost
+            self.returncode = -1
+            return
+        if pid == self.pid:
+            # same as os.waitstatus_to_exitcode, which requires Python 3.9
+            if os.WIFSIGNALED(status):
+                self.returncode = -os.WTERMSIG(status)
+            else:
+                self.returncode = os.WEXITSTATUS(status)
@@ -83,6 +83,10 @@ def setup_logger(logger=None, force=False):
     if logger is None:
         logger = logging.root
 
+    if util.in_child() and "VEER_LOG_FORWARD" in os.environ:
+        # records are forwarded to the host (see `veer.logforward`)
+        return
+
     # stop if logger is configured and user does not force
     if logger.hasHandlers() and not force:
         return
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Forward log records of children to the host in batches.
+
+If `logging.forward_level` (or VEER_LOG_FORWARD) is set, children do not log
+to their inherited stderr. Instead, records of at least that level are
+buffered (bounded by `logging.buffer_size`, dropping the oldest records, so
+that logging never blocks) and sent to the host while the call is running
+(every `logging.flush_interval` seconds or once a batch is full) as well as
+right before the return value. The host re-emits them via the `veer.child.<name>`
+loggers with the `call_id` and `child_pid` attached to each record.
+
+Batches are only sent while the child executes the function, as this is the
+only time the host expects messages other than replies from the child.
+"""
+
+__all__ = [
+    "ForwardingHandler",
+    "LogBatch",
+    "emit_batch",
+    "get_forward_level",
+    "get_handler",
+]
+
+import collections
+import logging
+import os
+import threading
+
+from . import util
+from .config import get_config
+
+log = logging.getLogger(__name__)
+
+# attributes of LogRecords sent to the host
+_RECORD_ATTRIBUTES = [
+    "created",
+    "exc_text",
+    "filename",
+    "funcName",
+    "levelname",
+    "levelno",
+    "lineno",
+    "module",
+    "msecs",
+    "name",
+    "pathname",
+    "stack_info",
+    "thread",
+    "threadName",
+]
+
+_handler = None
+
+
+def emit_batch(batch, call_id=None, child_pid=None):
+    """Re-emit the records of a batch on the host.
+
+    Args:
+        batch: LogBatch received from a child.
+
+        call_id: ID of the call the records were emitted during.
+
+        child_pid: PID of the child that emitted the records.
+    """
+    for entry in batch.records:
+        logger = logging.getLogger(f"veer.child.{entry['name']}")
+        if not logger.isEnabledFor(entry["levelno"]):
+            continue
+        record = logging.makeLogRecord(entry)
+        record.name = logger.name
+        record.call_id = call_id
+        record.child_pid = child_pid
+        if child_pid is not None:
+            record.process = child_pid
+        logger.handle(record)
+
+    if batch.dropped > 0:
+        log.warning(
+            f"Child {child_pid} dropped {batch.dropped} log records during call "
+            f"{call_id} (consider increasing logging.buffer_size)."
+        )
+
+
+def get_forward_level():
+    """Get the minimum level of records forwarded from children.
+
+    Returns:
+        int describing the level or None if forwarding is disabled.
+    """
+    level = get_config("logging.forward_level")
+    if level is None:
+        return None
+    if not str(level).isdigit():
+        return getattr(logging, str(level).upper())
+    return int(level)
+
+
+def get_handler():
+    """Get the ForwardingHandler of this child (None if forwarding is disabled
+    or not in a child)."""
+    return _handler
+
+
+class ForwardingHandler(logging.Handler):
+    """Buffers log records in the child and sends them to the host."""
+
+    def __init__(self, level=logging.NOTSET, capacity=None, flush_interval=None):
+        super().__init__(level=level)
+        if capacity is None:
+            capacity = int(get_config("logging.buffer_size"))
+        if flush_interval is None:
+            flush_interval = float(get_config("logging.flush_interval"))
+        self.flush_interval = flush_interval
+
+        self._active = False
+        self._batch_size = max(1, capacity // 2)
+        self._buffer = collections.deque(maxlen=capacity)
+        self._dropped = 0
+        self._flusher = None
+        self._send_lock = threading.Lock()
+        self._serializers = None
+        self._socket = None
+        self._wakeup = threading.Event()
+
+    def emit(self, record):
+        if self._flusher is not None and record.thread == self._flusher.ident:
+            # do not forward what the flusher logs about sending
+            return
+        try:
+            entry = {key: getattr(record, key, None) for key in _RECORD_ATTRIBUTES}
+            entry["msg"] = record.getMessage()
+            if record.exc_info and not record.exc_text:
+                entry["exc_text"] = logging.Formatter().formatException(record.exc_info)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self.lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._dropped += 1
+            self._buffer.append(entry)
+            if len(self._buffer) >= self._batch_size:
+                self._wakeup.set()
+
+    def start(self, socket, serializers=None):
+        """Start sending batches while the function is executed.
+
+        Args:
+            socket: Connection to the host.
+
+            serializers: Serializers negotiated with the host.
+        """
+        with self._send_lock:
+            self._socket = socket
+            self._serializers = serializers
+            self._active = True
+        if self._flusher is None:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, name="veer-log-forward", daemon=True
+            )
+            self._flusher.start()
+
+    def stop(self):
+        """Stop sending batches and send all remaining records (has to be
+        called before the reply to the host)."""
+        with self._send_lock:
+            self._active = False
+            self._send_batch()
+
+    def _flush_periodically(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._send_lock:
+                if self._active:
+                    self._send_batch()
+
+    def _send_batch(self):
+        # must be called with self._send_lock held
+        with self.lock:
+            records = list(self._buffer)
+            self._buffer.clear()
+            dropped, self._dropped = self._dropped, 0
+        if len(records) == 0 and dropped == 0:
+            return
+        util.send_object(
+            self._socket, LogBatch(records, dropped), serializers=self._serializers
+        )
+
+
+class LogBatch(object):
+    "Log records sent from a child to the host."
+
+    def __init__(self, records, dropped=0):
+        self.records = records
+        self.dropped = dropped
+
+
+def _install(level):
+    """Forward all records of at least `level` instead of logging to stderr
+    (in children)."""
+    global _handler
+    # loggers with their own level bypass that of the root logger
+    _handler = ForwardingHandler(level=level)
+    logging.root.addHandler(_handler)
+    logging.root.setLevel(level)
+
+
+if util.in_child() and "VEER_LOG_FORWARD" in os.environ:
+    _install(get_forward_level())
@@ -0,0 +1,454 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Lightweight metrics registry that can be exported in Prometheus text format.
+
+Metrics are kept in-process (updating them only takes a lock and a dictionary
+lookup) and are exported either via `start_http_server`, periodically via
+`start_textfile_writer` (e.g., for node-exporter's textfile collector) or
+programmatically via `snapshot`.
+
+The metrics collected by veer itself are defined at the bottom of this module.
+"""
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "autostart",
+    "format_prometheus",
+    "get_registry",
+    "snapshot",
+    "start_http_server",
+    "start_textfile_writer",
+    "write_textfile",
+]
+
+import bisect
+import http.server
+import logging
+import math
+import os
+import os.path as osp
+import tempfile
+import threading
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+_autostarted = False
+_autostart_lock = threading.Lock()
+
+
+def autostart():
+    """Start the exporters configured via `metrics.http_port` and
+    `metrics.textfile` (only once per process)."""
+    global _autostarted
+    if _autostarted:
+        return
+    with _autostart_lock:
+        if _autostarted:
+            return
+        _autostarted = True
+
+    # imported here because config depends on util, which updates the metrics
+    from .config import get_config
+
+    port = get_config("metrics.http_port")
+    if port is not None:
+        try:
+            start_http_server(int(port))
+        except OSError as e:
+            # exporting metrics must never make a call fail (e.g., if another
+            # process on the node already serves on the port)
+            log.warning(f"Could not serve metrics on port {port}: {e}")
+
+    textfile = get_config("metrics.textfile")
+    if textfile is not None:
+        start_textfile_writer(textfile, get_config("metrics.textfile_interval"))
+
+
+def format_prometheus(registry=None):
+    """Format all metrics in Prometheus text exposition format.
+
+    Args:
+        registry: Registry to format. If None, the default registry is used.
+
+    Returns:
+        String containing the formatted metrics.
+    """
+    if registry is None:
+        registry = get_registry()
+
+    lines = []
+    for metric in registry.get_metrics():
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for suffix, labels, value in metric.collect():
+            lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def get_registry():
+    """Get the process-wide default registry."""
+    return _registry
+
+
+def snapshot(registry=None):
+    """Get the current value of all metrics.
+
+    Args:
+        registry: Registry to snapshot. If None, the default registry is used.
+
+    Returns:
+        Dictionary mapping metric names to dictionaries that map label-value
+        tuples to values. Histograms are represented by dictionaries containing
+        `buckets` (upper bound -> cumulative count), `sum` and `count`.
+    """
+    if registry is None:
+        registry = get_registry()
+    return {metric.name: metric.snapshot() for metric in registry.get_metrics()}
+
+
+def start_http_server(port, address="127.0.0.1", registry=None):
+    """Serve metrics for Prometheus at `http://<address>:<port>/metrics` from a
+    background thread.
+
+    Args:
+        port: Port to listen on (0: choose a free port).
+
+        address: Address to listen on (default: only local connections).
+
+        registry: Registry to export. If None, the default registry is used.
+
+    Returns:
+        http.server.HTTPServer-instance (its `server_address` contains the
+        actual port, `shutdown()` stops it).
+    """
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ["/", "/metrics"]:
+                self.send_error(404)
+                return
+            body = format_prometheus(registry).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            log.debug(format % args)
+
+    server = http.server.ThreadingHTTPServer((address, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="veer-metrics-http", daemon=True
+    )
+    thread.start()
+    log.info(f"Serving metrics on http://{address}:{server.server_address[1]}/")
+    return server
+
+
+def start_textfile_writer(path, interval=None, registry=None):
+    """Periodically write metrics to `path` from a background thread.
+
+    Args:
+        path: File to write to (replaced atomically).
+
+        interval: Seconds between writes. If None, `metrics.textfile_interval`
+                  is used.
+
+        registry: Registry to export. If None, the default registry is used.
+
+    Returns:
+        threading.Event that stops the writer when set.
+    """
+    if interval is None:
+        from .config import get_config
+
+        interval = get_config("metrics.textfile_interval")
+    stop = threading.Event()
+
+    def run():
+        while True:
+            try:
+                write_textfile(path, registry)
+            except OSError as e:
+                log.warning(f"Could not write metrics to {path}: {e}")
+            if stop.wait(interval):
+                break
+
+    threading.Thread(target=run, name="veer-metrics-textfile", daemon=True).start()
+    return stop
+
+
+def write_textfile(path, registry=None):
+    """Write metrics in Prometheus text format to `path` (atomically)."""
+    directory = osp.dirname(osp.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".veer_metrics_", dir=directory)
+    with os.fdopen(fd, "w") as f:
+        f.write(format_prometheus(registry))
+    os.rename(tmp_path, path)
+
+
+def _escape(string):
+    return string.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _fmt(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _format_labels(labels):
+    if len(labels) == 0:
+        return ""
+    formatted = ",".join(
+        f'{name}="{_escape(str(value)).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in labels
+    )
+    return "{" + formatted + "}"
+
+
+class _Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._labelset = frozenset(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def collect(self):
+        """Yields (suffix, labels, value) for all samples of this metric."""
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in sorted(values):
+            yield "", list(zip(self.labelnames, labelvalues)), value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def _key(self, labels):
+        if labels.keys() != self._labelset:
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    "Monotonically increasing value."
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down. Alternatively, the value can be
+    determined by a function when collected (see `set_function`)."""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def collect(self):
+        if self._function is not None:
+            yield "", [], self._function()
+        else:
+            yield from super().collect()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """Determine the (unlabeled) value by calling `function` on
+        collection."""
+        self._function = function
+
+    def snapshot(self):
+        if self._function is not None:
+            return {(): self._function()}
+        return super().snapshot()
+
+
+class Histogram(_Metric):
+    "Distribution of observed values (e.g., latencies) in cumulative buckets."
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def collect(self):
+        for labelvalues, state in sorted(self.snapshot().items()):
+            labels = list(zip(self.labelnames, labelvalues))
+            for bound, count in state["buckets"].items():
+                yield "_bucket", labels + [("le", _fmt(bound))], count
+            yield "_sum", labels, state["sum"]
+            yield "_count", labels, state["count"]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def snapshot(self):
+        with self._lock:
+            values = {
+                key: (list(counts), total)
+                for key, (counts, total) in self._values.items()
+            }
+
+        snapshot = {}
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                buckets[bound] = cumulative
+            snapshot[key] = {"buckets": buckets, "sum": total, "count": cumulative}
+        return snapshot
+
+
+class Registry(object):
+    "Collection of metrics identified by name."
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        """Get or create a Counter."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Get or create a Gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def get_metrics(self):
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a Histogram."""
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name, None)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered differently.")
+            return metric
+
+
+def _get_queue_depth():
+    from .scheduler import get_scheduler
+
+    return get_scheduler().get_stats()["queued"]
+
+
+_registry = Registry()
+
+bytes_received = _registry.counter(
+    "veer_bytes_received_total", "Payload bytes received via socket."
+)
+bytes_sent = _registry.counter(
+    "veer_bytes_sent_total", "Payload bytes sent via socket."
+)
+call_duration = _registry.histogram(
+    "veer_call_duration_seconds",
+    "Duration of successful calls (excluding queue-wait).",
+    ["function"],
+)
+calls = _registry.counter(
+    "veer_calls_total",
+    "Finished calls by outcome (success, remote_error, timeout, cancelled, error).",
+    ["function", "outcome"],
+)
+children_live = _registry.gauge("veer_children_live", "Number of live children.")
+children_recycled = _registry.counter(
+    "veer_children_recycled_total",
+    "Number of long-lived children replaced by recycling policy.",
+    ["function", "policy"],
+)
+children_spawned = _registry.counter(
+    "veer_children_spawned_total", "Number of spawned children.", ["function"]
+)
+hedges_launched = _registry.counter(
+    "veer_hedges_launched_total", "Number of launched hedges.", ["function"]
+)
+hedges_won = _registry.counter(
+    "veer_hedges_won_total",
+    "Number of hedges that finished before the original execution.",
+    ["function"],
+)
+queue_depth = _registry.gauge(
+    "veer_queue_depth", "Number of calls waiting for a free slot in the scheduler."
+)
+queue_depth.set_function(_get_queue_depth)
+queue_wait = _registry.counter(
+    "veer_queue_wait_seconds_total",
+    "Total time calls spent waiting for a free slot in the scheduler.",
+    ["function"],
+)
+single_flight_hits = _registry.counter(
+    "veer_single_flight_hits_total",
+    "Number of calls served by an identical call already in flight.",
+    ["function"],
+)
+spawn_failures = _registry.counter(
+    "veer_spawn_failures_total",
+    "Number of children that failed to spawn.",
+    ["function"],
+)
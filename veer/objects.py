@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Content-addressed objects that long-lived children keep between calls.
+
+Large arguments (bytes-like objects and numpy arrays of at least
+`objects.ref_threshold` bytes) as well as objects explicitly registered via
+`put` are identified by the hash of their content. Each long-lived child keeps
+the objects it received in a store bounded by `objects.cache_size` bytes; if
+the child already holds an object, only its hash is sent.
+
+The host mirrors the content of each child's store and decides what the child
+evicts (least recently used first), so no additional round trip is needed to
+find out whether an object has to be sent.
+"""
+
+__all__ = [
+    "ObjectCache",
+    "ObjectRef",
+    "dereference",
+    "get_ref",
+    "put",
+    "resolve",
+    "update_store",
+]
+
+import collections
+import hashlib
+import logging
+import pickle as pkl
+import sys
+import weakref
+
+from .config import get_config
+
+log = logging.getLogger(__name__)
+
+
+# handles returned by `put` that are still alive (never evicted from children)
+_pinned = weakref.WeakValueDictionary()
+
+# objects held by this child (maps digests to objects)
+_store = {}
+
+
+def dereference(args, kwargs):
+    """Replace all ObjectRefs among the arguments by the objects they refer to
+    (for children that do not keep objects)."""
+    return (
+        tuple(_dereference(value) for value in args),
+        {key: _dereference(value) for key, value in kwargs.items()},
+    )
+
+
+def get_ref(obj):
+    """Get an ObjectRef for `obj` if it should be sent by reference.
+
+    Returns:
+        ObjectRef for ObjectRefs, bytes-like objects and numpy arrays of at
+        least `objects.ref_threshold` bytes, None otherwise.
+    """
+    if isinstance(obj, ObjectRef):
+        return obj
+
+    if isinstance(obj, (bytes, bytearray)):
+        if len(obj) < get_config("objects.ref_threshold"):
+            return None
+        return ObjectRef(_hash(type(obj).__name__, obj), len(obj), obj)
+
+    # if numpy was never imported, obj cannot be an array
+    np = sys.modules.get("numpy", None)
+    if np is not None and type(obj) is np.ndarray and not obj.dtype.hasobject:
+        if obj.nbytes < get_config("objects.ref_threshold"):
+            return None
+        data = np.ascontiguousarray(obj).reshape(-1).view(np.uint8)
+        return ObjectRef(
+            _hash(f"ndarray {obj.dtype.str} {obj.shape}", data), obj.nbytes, obj
+        )
+
+    return None
+
+
+def put(obj):
+    """Register an object that is kept by long-lived children.
+
+    The returned handle can be passed to veerified functions instead of `obj`;
+    its content is hashed only once. Children keep the object as long as the
+    handle is alive (it is never evicted in favor of other objects).
+
+    Args:
+        obj: Object that must not be modified afterwards.
+
+    Returns:
+        ObjectRef-instance.
+    """
+    ref = get_ref(obj)
+    if ref is None:
+        pickled = pkl.dumps(obj, protocol=pkl.HIGHEST_PROTOCOL)
+        ref = ObjectRef(_hash("pickle", pickled), len(pickled), obj)
+    _pinned[ref.digest] = ref
+    return ref
+
+
+def resolve(args, kwargs):
+    """Replace all ObjectRefs among the arguments by the objects held by this
+    child."""
+    return (
+        tuple(_resolve(value) for value in args),
+        {key: _resolve(value) for key, value in kwargs.items()},
+    )
+
+
+def update_store(store, evict):
+    """Add and remove objects held by this child as instructed by the host.
+
+    Args:
+        store: Dictionary mapping digests to objects to keep.
+
+        evict: List of digests of objects to remove.
+    """
+    for digest in evict:
+        del _store[digest]
+    _store.update(store)
+    if log.getEffectiveLevel() <= logging.DEBUG:
+        log.debug(f"Holding {len(_store)} objects ({len(store)} new).")
+
+
+def _dereference(value):
+    if isinstance(value, ObjectRef):
+        return value.obj
+    return value
+
+
+def _hash(kind, data):
+    digest = hashlib.blake2b(kind.encode("utf-8"), digest_size=16)
+    digest.update(memoryview(data))
+    return digest.hexdigest()
+
+
+def _resolve(value):
+    if isinstance(value, ObjectRef):
+        try:
+            return _store[value.digest]
+        except KeyError:
+            raise RuntimeError(f"Object {value.digest} is not held by this child.")
+    return value
+
+
+class ObjectCache(object):
+    """Host-side mirror of the objects held by a single long-lived child."""
+
+    def __init__(self, capacity=None):
+        """
+        Args:
+            capacity: Maximum total size in bytes of the objects held by the
+                      child. If None, `objects.cache_size` is used.
+        """
+        if capacity is None:
+            capacity = get_config("objects.cache_size")
+        self.capacity = capacity
+        self.size = 0
+        # maps digests to sizes, least recently used first
+        self._entries = collections.OrderedDict()
+
+    def __contains__(self, digest):
+        return digest in self._entries
+
+    def prepare(self, args, kwargs, stats=None):
+        """Replace large arguments by references.
+
+        Args:
+            args: Positional arguments of the call.
+
+            kwargs: Keyword arguments of the call.
+
+            stats: If given, collections.Counter in which the number of
+                   arguments the child already holds (`object_hits`) and that
+                   have to be sent (`object_misses`) is accumulated.
+
+        Returns:
+            Tuple of the arguments to send, keyword arguments to send, objects
+            the child has to store (see `update_store`) and digests of the
+            objects it has to evict.
+        """
+        store = {}
+        needed = set()
+
+        def replace(value):
+            ref = get_ref(value)
+            if ref is None:
+                return value
+            if ref.nbytes > self.capacity:
+                return ref.obj
+            needed.add(ref.digest)
+
+            if ref.digest in self._entries:
+                self._entries.move_to_end(ref.digest)
+                if ref.digest not in store and stats is not None:
+                    stats["object_hits"] += 1
+            else:
+                self._entries[ref.digest] = ref.nbytes
+                self.size += ref.nbytes
+                store[ref.digest] = ref.obj
+                if stats is not None:
+                    stats["object_misses"] += 1
+            return ObjectRef(ref.digest, ref.nbytes)
+
+        args = tuple(replace(value) for value in args)
+        kwargs = {key: replace(value) for key, value in kwargs.items()}
+
+        evict = []
+        for digest, nbytes in list(self._entries.items()):
+            if self.size <= self.capacity:
+                break
+            # keep objects needed by this call or pinned via `put`
+            if digest in needed or digest in _pinned:
+                continue
+            del self._entries[digest]
+            self.size -= nbytes
+            evict.append(digest)
+
+        return args, kwargs, store, evict
+
+
+class ObjectRef(object):
+    """Handle for an object identified by the hash of its content.
+
+    Only the digest is sent to children, which look the object up in their
+    store.
+    """
+
+    def __init__(self, digest, nbytes, obj=None):
+        self.digest = digest
+        self.nbytes = nbytes
+        # only available on the host
+        self.obj = obj
+
+    def __getstate__(self):
+        return {"digest": self.digest, "nbytes": self.nbytes, "obj": None}
+
+    def __repr__(self):
+        return f"ObjectRef({self.digest}, {self.nbytes} bytes)"
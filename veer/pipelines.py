@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Chains of veerified functions executed without returning intermediate
+results to the host."""
+
+__all__ = [
+    "Pipeline",
+    "pipeline",
+]
+
+import concurrent.futures as cf
+import importlib
+import logging
+import sys
+
+from . import objects
+from .core import Veerify, in_subprocess
+
+log = logging.getLogger(__name__)
+
+
+def pipeline(*stages, **kwargs):
+    """Compose veerified functions into a pipeline.
+
+    The first stage receives the arguments the pipeline is called with, each
+    following stage receives the result of the previous one. Consecutive
+    stages are executed in a single child (so intermediate results never pass
+    through the host) and therefore have to share the same container settings.
+
+    A tuple of veerified functions or pipelines describes independent branches
+    that are executed in parallel children. Each branch receives the result of
+    the previous stage and the next stage receives the tuple of all branch
+    results.
+
+    Example:
+        `veer.pipeline(load, preprocess, (simulate_a, simulate_b), reduce)`
+        runs `load` and `preprocess` in one child, both simulations in two
+        further children and `reduce` in a final child.
+
+    Args:
+        stages: Veerified functions or tuples thereof.
+
+        kwargs: Further keyword arguments are passed on to the `Veerify`
+                executing consecutive stages (e.g., `timeout`).
+
+    Returns:
+        Pipeline-instance.
+    """
+    return Pipeline(stages, **kwargs)
+
+
+def _check_stage(stage, allow_pipeline=False):
+    if isinstance(stage, Veerify) or (allow_pipeline and isinstance(stage, Pipeline)):
+        return
+    raise TypeError(f"Pipeline stages have to be veerified functions: {stage!r}")
+
+
+@in_subprocess
+def _execute_stages(stages, args, kwargs):
+    """Execute consecutive stages in the child."""
+    for module_name, func_name, func_dir in stages:
+        if func_dir not in sys.path:
+            sys.path.append(func_dir)
+        veerified = getattr(importlib.import_module(module_name), func_name)
+
+        # call the original function to not spawn another child
+        retval = veerified._func(*args, **kwargs)
+        args, kwargs = (retval,), {}
+    return retval
+
+
+class Pipeline(object):
+    "Callable executing a chain of veerified functions (see `pipeline`)."
+
+    def __init__(self, stages, **kwargs):
+        if len(stages) == 0:
+            raise ValueError("Pipelines need at least one stage.")
+
+        # callables (each executing consecutive stages in one child) and
+        # tuples of branches
+        self._segments = []
+
+        consecutive = []
+        for stage in stages:
+            if isinstance(stage, tuple):
+                for branch in stage:
+                    _check_stage(branch, allow_pipeline=True)
+                if len(consecutive) > 0:
+                    self._segments.append(self._fuse(consecutive, kwargs))
+                    consecutive = []
+                self._segments.append(stage)
+            else:
+                _check_stage(stage)
+                consecutive.append(stage)
+        if len(consecutive) > 0:
+            self._segments.append(self._fuse(consecutive, kwargs))
+
+    def __call__(self, *args, **kwargs):
+        for segment in self._segments:
+            if isinstance(segment, tuple):
+                retval = self._execute_branches(segment, args, kwargs)
+            else:
+                retval = segment(*args, **kwargs)
+            args, kwargs = (retval,), {}
+        return retval
+
+    def _execute_branches(self, branches, args, kwargs):
+        with cf.ThreadPoolExecutor(
+            max_workers=len(branches), thread_name_prefix="veer-pipeline"
+        ) as executor:
+            futures = [executor.submit(branch, *args, **kwargs) for branch in branches]
+            # wait for all branches so that no child outlives a failed call
+            cf.wait(futures)
+        return tuple(future.result() for future in futures)
+
+    def _fuse(self, stages, kwargs):
+        """Get a callable executing consecutive stages in a single child."""
+        if len(stages) == 1 and len(kwargs) == 0:
+            return stages[0]
+
+        container_settings = {
+            (s._container_image, s._container_app, s._always_in_container)
+            for s in stages
+        }
+        if len(container_settings) > 1:
+            raise ValueError(
+                "Consecutive stages must share container image and app: "
+                + ", ".join(s._func_name for s in stages)
+            )
+        image, app, always_in_container = container_settings.pop()
+
+        specs = [
+            (s._get_module_import_name(), s._func_name, s._func_dir) for s in stages
+        ]
+        veerified = Veerify(
+            _execute_stages._func,
+            container_image=image,
+            container_app=app,
+            always_in_container=always_in_container,
+            **kwargs,
+        )
+        # the child imports the modules of all stages
+        veerified._extra_func_dirs = [s._func_dir for s in stages]
+        log.debug(f"Fused stages: {', '.join(s._func_name for s in stages)}")
+
+        def execute(*args, **kwargs):
+            # the arguments are nested in those of the fused call, where
+            # ObjectRefs would not be resolved
+            args, kwargs = objects.dereference(args, kwargs)
+            return veerified(specs, args, kwargs)
+
+        return execute
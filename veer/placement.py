@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+__all__ = [
+    "CpuAllocator",
+    "THREAD_ENV_VARIABLES",
+    "format_cpulist",
+    "get_allocator",
+    "get_numa_nodes",
+    "parse_cpulist",
+]
+
+import collections
+import glob
+import logging
+import os
+import os.path as osp
+import threading
+
+log = logging.getLogger(__name__)
+
+
+# environment variables limiting the number of threads of common
+# OpenMP/BLAS implementations
+THREAD_ENV_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+]
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def format_cpulist(cpus):
+    """Format CPUs as comma-separated list (e.g., `0,1,2,8`).
+
+    Args:
+        cpus: Iterable of ints.
+
+    Returns:
+        String describing the sorted CPUs.
+    """
+    return ",".join(str(cpu) for cpu in sorted(cpus))
+
+
+def get_allocator():
+    """Get the process-wide CPU allocator."""
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = CpuAllocator()
+        return _allocator
+
+
+def get_numa_nodes():
+    """Get the CPUs available to this process grouped by NUMA node.
+
+    Returns:
+        List of sets of ints (one set per NUMA node). If no topology
+        information is available, a single node containing all available CPUs is
+        returned.
+    """
+    available = os.sched_getaffinity(0)
+
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        try:
+            with open(path, "r") as f:
+                cpus = parse_cpulist(f.read()) & available
+        except (OSError, ValueError):
+            log.debug(f"Could not read NUMA topology from {osp.dirname(path)}.")
+            continue
+        if len(cpus) > 0:
+            nodes.append(cpus)
+
+    # CPUs not covered by any node (e.g., no topology information)
+    remaining = available.difference(*nodes)
+    if len(remaining) > 0:
+        nodes.append(remaining)
+
+    return nodes
+
+
+def parse_cpulist(cpulist):
+    """Parse a list of CPUs in the kernel's format (e.g., `0-3,8,10-11`).
+
+    Args:
+        cpulist: String describing the CPUs.
+
+    Returns:
+        Set of ints.
+    """
+    cpus = set()
+    for part in cpulist.strip().split(","):
+        if len(part) == 0:
+            continue
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+class CpuAllocator(object):
+    """Assigns CPU sets to children so that parallel children do not compete
+    for the same cores.
+
+    As long as enough CPUs are free, allocated sets are disjoint and confined
+    to a single NUMA node if they fit. Otherwise, the least used CPUs are
+    shared.
+    """
+
+    def __init__(self, nodes=None):
+        """
+        Args:
+            nodes: List of sets of CPUs (one per NUMA node). If None, the
+                   topology is determined via `get_numa_nodes()`.
+        """
+        if nodes is None:
+            nodes = get_numa_nodes()
+        self._nodes = [sorted(node) for node in nodes]
+        self._usage = collections.Counter()
+        self._lock = threading.Lock()
+
+    def allocate(self, num_cpus):
+        """Allocate a set of CPUs.
+
+        Args:
+            num_cpus: Number of CPUs to allocate. If it exceeds the number of
+                      available CPUs, all CPUs are allocated.
+
+        Returns:
+            Set of ints describing the allocated CPUs.
+        """
+        with self._lock:
+            usage = self._usage
+
+            def least_used(cpus, num):
+                return sorted(cpus, key=lambda cpu: (usage[cpu], cpu))[:num]
+
+            fitting = [node for node in self._nodes if len(node) >= num_cpus]
+            if len(fitting) > 0:
+                # pick the node that leads to the least sharing and, among
+                # those, the one with fewest free CPUs (best fit) so that larger
+                # requests can still be served without sharing later on
+                def cost(node):
+                    chosen = least_used(node, num_cpus)
+                    free = sum(1 for cpu in node if usage[cpu] == 0)
+                    return (sum(usage[cpu] for cpu in chosen), free)
+
+                cpus = least_used(min(fitting, key=cost), num_cpus)
+            else:
+                cpus = least_used(
+                    [cpu for node in self._nodes for cpu in node], num_cpus
+                )
+
+            for cpu in cpus:
+                usage[cpu] += 1
+
+        if log.getEffectiveLevel() <= logging.DEBUG:
+            log.debug(f"Allocated CPUs: {format_cpulist(cpus)}")
+        return set(cpus)
+
+    def get_usage(self):
+        """Get the number of children each allocated CPU is assigned to.
+
+        Returns:
+            Dictionary mapping CPUs to the number of children using them.
+        """
+        with self._lock:
+            return {cpu: count for cpu, count in self._usage.items() if count > 0}
+
+    def release(self, cpus):
+        """Release CPUs that were allocated via `allocate`."""
+        with self._lock:
+            for cpu in cpus:
+                self._usage[cpu] -= 1
+                if self._usage[cpu] <= 0:
+                    del self._usage[cpu]
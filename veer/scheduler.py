@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+__all__ = [
+    "PRIORITIES",
+    "Scheduler",
+    "get_priority",
+    "get_scheduler",
+]
+
+import collections
+import contextlib
+import itertools as it
+import logging
+import threading
+import time
+import weakref
+
+from .config import get_config
+from .exception import RemoteTimeoutError
+
+log = logging.getLogger(__name__)
+
+
+PRIORITIES = {
+    "high": 0,
+    "normal": 10,
+    "low": 20,
+}
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_priority(priority):
+    """Convert a priority class to its numerical value.
+
+    Args:
+        priority: Name of a priority class (see `PRIORITIES`) or int. Lower
+                  values are scheduled first.
+
+    Returns:
+        int describing the priority.
+    """
+    if isinstance(priority, str):
+        try:
+            return PRIORITIES[priority]
+        except KeyError:
+            raise ValueError(
+                f"Unknown priority class {priority}, "
+                f"choose from: {', '.join(PRIORITIES)}"
+            )
+    return int(priority)
+
+
+def get_scheduler():
+    """Get the process-wide scheduler that is shared by all veerified
+    functions."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+
+class _Waiter(object):
+    def __init__(self, name, priority, quota, seqnum):
+        self.name = name
+        self.priority = priority
+        self.quota = quota
+        self.seqnum = seqnum
+        self.granted = threading.Event()
+
+
+class Scheduler(object):
+    """Limits the number of live children across all veerified functions.
+
+    Limits are read from the config whenever a slot becomes available so that
+    they can be adjusted at runtime:
+    * `scheduler.max_children`: global cap on live children (None: unlimited)
+    * `scheduler.quotas`: mapping of function names to the maximum number of
+      live children of that function
+    * `scheduler.policy`: `fifo` grants slots in order of priority and then
+      arrival, `fair` prefers functions with fewer live children among waiters
+      of the same priority.
+
+    Idle long-lived children are retired (via their reclaimer, see
+    `add_reclaimer`) when requests of other functions wait for a slot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._live = collections.Counter()
+        self._seqnums = it.count()
+        self._stats = collections.Counter()
+        self._reclaimers = weakref.WeakSet()
+
+    def acquire(self, name, priority="normal", quota=None, timeout=None):
+        """Wait for a free slot to spawn a child.
+
+        Args:
+            name: String identifying the function the child is spawned for.
+
+            priority: Priority class or int (see `get_priority`).
+
+            quota: Maximum number of live children for `name`. If None, it is
+                   looked up in `scheduler.quotas`.
+
+            timeout: Maximum time in seconds to wait for a slot (None: forever).
+
+        Returns:
+            float describing the time in seconds spent waiting in the queue.
+        """
+        if quota is None:
+            quota = (get_config("scheduler.quotas") or {}).get(name, None)
+
+        start = time.monotonic()
+        with self._lock:
+            waiter = _Waiter(name, get_priority(priority), quota, next(self._seqnums))
+            self._waiters.append(waiter)
+            self._dispatch()
+            reclaimers = []
+            if not waiter.granted.is_set() and self._is_starving(waiter):
+                reclaimers = [r for r in self._reclaimers if r.name != name]
+
+        # retiring a child releases its slot, hence outside of the lock
+        for reclaimer in reclaimers:
+            if reclaimer.reclaim():
+                break
+
+        if not waiter.granted.wait(timeout):
+            with self._lock:
+                # the slot might have been granted in the meantime
+                if not waiter.granted.is_set():
+                    self._waiters.remove(waiter)
+                    self._stats["timeouts"] += 1
+                    raise RemoteTimeoutError(
+                        f"{name} did not get a free slot within {timeout}s."
+                    )
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats["waits"] += 1
+            self._stats["wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(
+                self._stats["max_wait_seconds"], waited
+            )
+        if waited > 0.1 and log.getEffectiveLevel() <= logging.DEBUG:
+            log.debug(f"{name} waited {waited:.3f}s for a free slot.")
+        return waited
+
+    def add_reclaimer(self, reclaimer):
+        """Register an object holding slots for idle children (e.g., a worker
+        pool).
+
+        Args:
+            reclaimer: Object with a `name` (see `acquire`) and a `reclaim()`
+                       method that retires one idle child (returning True) or
+                       returns False if there is none. It is only referenced
+                       weakly.
+        """
+        with self._lock:
+            self._reclaimers.add(reclaimer)
+
+    def is_contended(self, name):
+        """Check whether requests of functions other than `name` wait for a
+        slot that is held by a live child (i.e., idle children of `name` should
+        be retired rather than kept)."""
+        with self._lock:
+            return any(
+                waiter.name != name and self._is_starving(waiter)
+                for waiter in self._waiters
+            )
+
+    def get_stats(self):
+        """Get a snapshot of the scheduler's state.
+
+        Returns:
+            Dictionary containing the number of `live` children, the number of
+            `queued` requests, how many requests waited for a slot (`waits`), the
+            total and maximum queue-wait time (`wait_seconds`,
+            `max_wait_seconds`) and the number of requests that timed out while
+            waiting (`timeouts`).
+        """
+        with self._lock:
+            stats = {
+                "live": sum(self._live.values()),
+                "queued": len(self._waiters),
+            }
+            for key in ["waits", "wait_seconds", "max_wait_seconds", "timeouts"]:
+                stats[key] = self._stats[key]
+        return stats
+
+    def release(self, name):
+        """Free the slot of a child of `name` that exited."""
+        with self._lock:
+            self._live[name] -= 1
+            if self._live[name] <= 0:
+                del self._live[name]
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def slot(self, name, priority="normal", quota=None, timeout=None):
+        """Context manager holding a slot (see `acquire` for arguments).
+
+        Yields:
+            float describing the time in seconds spent waiting in the queue.
+        """
+        waited = self.acquire(name, priority=priority, quota=quota, timeout=timeout)
+        try:
+            yield waited
+        finally:
+            self.release(name)
+
+    def _is_starving(self, waiter):
+        """Check whether `waiter` only waits because of the global cap. Needs
+        to be called with lock held."""
+        if get_config("scheduler.max_children") is None:
+            return False
+        return waiter.quota is None or self._live[waiter.name] < waiter.quota
+
+    def _dispatch(self):
+        """Grant free slots to waiters. Needs to be called with lock held."""
+        max_children = get_config("scheduler.max_children")
+
+        if get_config("scheduler.policy") == "fair":
+
+            def key(waiter):
+                return (waiter.priority, self._live[waiter.name], waiter.seqnum)
+
+        else:
+
+            def key(waiter):
+                return (waiter.priority, waiter.seqnum)
+
+        while self._waiters:
+            if max_children is not None and sum(self._live.values()) >= max_children:
+                break
+
+            eligible = [
+                w
+                for w in self._waiters
+                if w.quota is None or self._live[w.name] < w.quota
+            ]
+            if not eligible:
+                break
+
+            waiter = min(eligible, key=key)
+            self._waiters.remove(waiter)
+            self._live[waiter.name] += 1
+            waiter.granted.set()
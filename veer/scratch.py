@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+__all__ = [
+    "MappedResult",
+    "get_mmap_threshold",
+    "get_scratch_dir",
+    "is_mappable",
+    "remove_results",
+]
+
+import glob
+import logging
+import mmap
+import os
+import os.path as osp
+import sys
+import tempfile
+
+from .config import get_config
+
+log = logging.getLogger(__name__)
+
+
+def get_mmap_threshold():
+    """Get the minimum size (in bytes) a result needs to have in order to be
+    transferred via memory-mapped file.
+
+    Returns:
+        int describing the threshold in bytes.
+    """
+    return int(get_config("scratch.mmap_threshold"))
+
+
+def get_scratch_dir():
+    """Get the directory used to exchange large results between host and child.
+
+    It is taken from the `scratch.directory` config entry (or `VEER_SCRATCH_DIR`)
+    and defaults to the system's temporary directory. When running in a container,
+    the directory is bound into the container.
+
+    Returns:
+        String describing the absolute path of the scratch directory.
+    """
+    scratch_dir = get_config("scratch.directory")
+    if scratch_dir is None:
+        scratch_dir = tempfile.gettempdir()
+    return osp.abspath(osp.expanduser(scratch_dir))
+
+
+def is_mappable(obj, threshold=None):
+    """Check if `obj` can (and should) be transferred via memory-mapped file.
+
+    Args:
+        obj: Object to check.
+
+        threshold: Minimum size in bytes. If None, use `get_mmap_threshold()`.
+
+    Returns:
+        True if `obj` is a bytes-like object or numpy array (without python
+        objects) of at least `threshold` bytes.
+    """
+    if threshold is None:
+        threshold = get_mmap_threshold()
+
+    # numpy is not imported here to keep the startup of the child fast: if it
+    # was never imported, obj cannot be an array
+    np = sys.modules.get("numpy", None)
+
+    if isinstance(obj, (bytes, bytearray)):
+        nbytes = len(obj)
+    elif np is not None and isinstance(obj, np.ndarray) and not obj.dtype.hasobject:
+        nbytes = obj.nbytes
+    else:
+        return False
+
+    # empty files cannot be mapped
+    return nbytes > 0 and nbytes >= threshold
+
+
+def remove_results(pid, directory=None):
+    """Remove all results written by the given process (e.g., after it was
+    killed, its results will never be loaded).
+
+    Args:
+        pid: PID of the process that wrote the results.
+
+        directory: Directory to clean. If None, use `get_scratch_dir()`.
+    """
+    if directory is None:
+        directory = get_scratch_dir()
+    for path in glob.glob(osp.join(directory, f"veer_result_{pid}_*")):
+        log.debug(f"Removing stale result {path}.")
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class MappedResult(object):
+    """Placeholder for a large result that the child wrote to the scratch
+    directory instead of sending it via socket.
+
+    On the host, `load()` maps the file into memory lazily, i.e. only the pages
+    that are actually accessed are read from disk.
+    """
+
+    def __init__(self, path, nbytes, dtype=None, shape=None):
+        self.path = path
+        self.nbytes = nbytes
+        self.dtype = dtype
+        self.shape = shape
+
+    @classmethod
+    def dump(cls, obj, directory=None):
+        """Write `obj` to a new file in `directory`.
+
+        Args:
+            obj: bytes-like object or numpy array to write.
+
+            directory: Directory to write to. If None, use `get_scratch_dir()`.
+
+        Returns:
+            MappedResult-instance describing the written file.
+        """
+        if directory is None:
+            directory = get_scratch_dir()
+
+        # the PID allows the host to remove results of killed children (see
+        # `remove_results`)
+        fd, path = tempfile.mkstemp(
+            prefix=f"veer_result_{os.getpid()}_", suffix=".bin", dir=directory
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(obj, (bytes, bytearray)):
+                    f.write(obj)
+                    return cls(path, len(obj))
+                else:
+                    # tofile always writes in C-order
+                    obj.tofile(f)
+                    # the string representation lacks the fields of structured
+                    # dtypes, which are kept as dtype-instance instead
+                    dtype = obj.dtype.str if obj.dtype.fields is None else obj.dtype
+                    return cls(path, obj.nbytes, dtype=dtype, shape=obj.shape)
+        except BaseException:
+            os.remove(path)
+            raise
+
+    def load(self):
+        """Map the result into memory.
+
+        The backing file is removed right away; the data stays accessible for as
+        long as the returned object (and hence the mapping) is alive.
+
+        Returns:
+            numpy.memmap (copy-on-write) if the result was a numpy array,
+            read-only mmap.mmap otherwise.
+        """
+        if log.getEffectiveLevel() <= logging.DEBUG:
+            log.debug(f"Mapping result from {self.path} ({self.nbytes} bytes).")
+        try:
+            if self.dtype is None:
+                with open(self.path, "rb") as f:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                import numpy as np
+
+                return np.memmap(
+                    self.path, dtype=np.dtype(self.dtype), mode="c", shape=self.shape
+                )
+        finally:
+            os.remove(self.path)
@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+__all__ = [
+    "JsonSerializer",
+    "MsgpackSerializer",
+    "NumpySerializer",
+    "PickleSerializer",
+    "Placeholder",
+    "Serializer",
+    "dumps",
+    "format_available",
+    "get_available",
+    "get_serializer",
+    "join_arguments",
+    "loads",
+    "negotiate",
+    "parse_available",
+    "register_serializer",
+    "set_type_serializer",
+    "split_arguments",
+]
+
+import importlib.util
+import json
+import logging
+import pickle as pkl
+import struct
+import sys
+
+log = logging.getLogger(__name__)
+
+
+_serializers = {}
+
+# maps fully qualified type names to the serializer to use for them
+_type_serializers = {}
+
+
+def dumps(obj, negotiated=None, preferred=None):
+    """Serialize `obj` with the cheapest applicable serializer.
+
+    The serializers are tried in the following order: `preferred`, the one
+    registered for the type of `obj` (see `set_type_serializer`) and finally
+    pickle. Serializers that are not contained in `negotiated` or cannot encode
+    `obj` (without changing it) are skipped.
+
+    Args:
+        obj: Object to serialize.
+
+        negotiated: Dictionary mapping the names of serializers supported by
+                    both sides to the version to use (see `negotiate`). If None,
+                    all locally available serializers are used.
+
+        preferred: Name of the serializer to try first.
+
+    Returns:
+        Tuple of the name of the used serializer and a list of bytes-like
+        objects that make up the serialized object when concatenated.
+    """
+    if negotiated is None:
+        negotiated = get_available()
+
+    type_name = _get_type_name(obj)
+    for name in [preferred, _type_serializers.get(type_name, None), "pickle"]:
+        if name is None or name not in negotiated:
+            continue
+        try:
+            return name, _serializers[name].dumps(obj, negotiated[name])
+        except Exception as e:
+            if name == "pickle":
+                raise
+            if log.getEffectiveLevel() <= logging.DEBUG:
+                log.debug(f"Could not serialize {type_name} via {name}: {e}")
+
+    raise ValueError(f"No serializer available for {type_name}.")
+
+
+def format_available(available):
+    """Format the output of `get_available` as string (e.g., for environment
+    variables)."""
+    return ",".join(f"{name}={version}" for name, version in available.items())
+
+
+def get_available():
+    """Get all serializers usable in this interpreter.
+
+    Returns:
+        Dictionary mapping serializer names to their version.
+    """
+    return {
+        name: serializer.version
+        for name, serializer in _serializers.items()
+        if serializer.is_available()
+    }
+
+
+def get_serializer(name):
+    """Get registered serializer by name."""
+    try:
+        return _serializers[name]
+    except KeyError:
+        raise ValueError(f"Unknown serializer: {name}")
+
+
+def join_arguments(args, kwargs, receive):
+    """Replace the placeholders inserted by `split_arguments`.
+
+    Args:
+        args: Sequence of positional arguments.
+
+        kwargs: Dictionary of keyword arguments.
+
+        receive: Callable returning the next separately sent argument.
+
+    Returns:
+        Tuple of positional and keyword arguments.
+    """
+    # arguments are sent in the order the placeholders appear in
+    args = tuple(receive() if isinstance(arg, Placeholder) else arg for arg in args)
+    kwargs = {
+        key: receive() if isinstance(value, Placeholder) else value
+        for key, value in kwargs.items()
+    }
+    return args, kwargs
+
+
+def loads(name, data):
+    """Deserialize an object.
+
+    Args:
+        name: Name of the serializer used to serialize the object.
+
+        data: bytes-like object containing the serialized object. If it is
+              writable (e.g., a bytearray), deserialized arrays are writable
+              without copy.
+
+    Returns:
+        The deserialized object.
+    """
+    return get_serializer(name).loads(data)
+
+
+def negotiate(own, peer):
+    """Determine the serializers both sides of a connection can use.
+
+    Args:
+        own: Dictionary of locally available serializers (see `get_available`).
+
+        peer: Dictionary of serializers available to the peer.
+
+    Returns:
+        Dictionary mapping serializer names to the lower of both versions.
+    """
+    return {
+        name: min(version, peer[name]) for name, version in own.items() if name in peer
+    }
+
+
+def parse_available(string):
+    """Parse the output of `format_available`."""
+    available = {}
+    for item in string.split(","):
+        if len(item) == 0:
+            continue
+        name, version = item.split("=")
+        available[name] = int(version)
+    return available
+
+
+def register_serializer(serializer):
+    """Register a serializer so that it can be negotiated and selected.
+
+    Args:
+        serializer: Serializer-instance. Serializers with the same name are
+                    replaced.
+    """
+    _serializers[serializer.name] = serializer
+
+
+def split_arguments(args, kwargs, negotiated=None):
+    """Take out the arguments that have a serializer registered for their type
+    (see `set_type_serializer`) so that they can be sent separately with it.
+
+    Args:
+        args: Tuple of positional arguments.
+
+        kwargs: Dictionary of keyword arguments.
+
+        negotiated: Dictionary of serializers supported by both sides (see
+                    `negotiate`). If None, all locally available serializers
+                    may be used.
+
+    Returns:
+        Tuple of positional and keyword arguments (with `Placeholder`-instances
+        in place of the arguments taken out) and the list of arguments taken
+        out.
+    """
+    if negotiated is None:
+        negotiated = get_available()
+    separate = []
+
+    def take_out(value):
+        if _type_serializers.get(_get_type_name(value), None) not in negotiated:
+            return value
+        separate.append(value)
+        return Placeholder()
+
+    if len(_type_serializers) > 0:
+        args = tuple(take_out(arg) for arg in args)
+        kwargs = {key: take_out(value) for key, value in kwargs.items()}
+    return args, kwargs, separate
+
+
+def set_type_serializer(type_, name):
+    """Use a specific serializer for all objects of the given type.
+
+    Args:
+        type_: Type or fully qualified name of the type (e.g., `numpy.ndarray`).
+               Subclasses are not affected.
+
+        name: Name of the serializer to use or None to use the default.
+    """
+    if not isinstance(type_, str):
+        type_ = f"{type_.__module__}.{type_.__qualname__}"
+    if name is None:
+        _type_serializers.pop(type_, None)
+    else:
+        _type_serializers[type_] = name
+
+
+def _check_plain(obj, scalar_types, key_types):
+    """Raise TypeError unless `obj` only consists of lists, dictionaries (with
+    keys of `key_types`) and scalars of exactly `scalar_types`, i.e., data that
+    is restored exactly by serializers like json or msgpack (which would, e.g.,
+    turn tuples into lists or numpy scalars into Python scalars)."""
+    stack = [obj]
+    while len(stack) > 0:
+        obj = stack.pop()
+        type_ = type(obj)
+        if type_ in scalar_types:
+            continue
+        elif type_ is list:
+            stack.extend(obj)
+        elif type_ is dict:
+            for key in obj:
+                if type(key) not in key_types:
+                    raise TypeError(f"Cannot restore keys of type {type(key)}.")
+            stack.extend(obj.values())
+        else:
+            raise TypeError(f"Cannot restore objects of type {type_}.")
+
+
+def _get_type_name(obj):
+    return f"{type(obj).__module__}.{type(obj).__qualname__}"
+
+
+def _module_available(module_name):
+    # checking for the spec avoids the cost of actually importing the module
+    return importlib.util.find_spec(module_name) is not None
+
+
+class Serializer(object):
+    """Base class for serializers.
+
+    Each serializer has a unique `name` and a `version` that is exchanged when
+    host and child connect; both sides then use the lower version.
+    """
+
+    name = None
+    version = 1
+
+    def dumps(self, obj, version):
+        """Serialize `obj`.
+
+        Args:
+            obj: Object to serialize.
+
+            version: Negotiated version to use.
+
+        Returns:
+            List of bytes-like objects.
+
+        Raises:
+            TypeError or ValueError if the serializer cannot encode `obj`
+            (other exceptions are handled the same way by `dumps`).
+        """
+        raise NotImplementedError
+
+    def is_available(self):
+        return True
+
+    def loads(self, data):
+        raise NotImplementedError
+
+
+class JsonSerializer(Serializer):
+    """JSON, always available and used for the initial handshake.
+
+    Only encodes plain data (lists, dictionaries with string keys, strings,
+    numbers, booleans and None) that is restored exactly.
+    """
+
+    name = "json"
+
+    scalar_types = {type(None), bool, int, float, str}
+    key_types = {str}
+
+    def dumps(self, obj, version):
+        _check_plain(obj, self.scalar_types, self.key_types)
+        return [json.dumps(obj).encode("utf-8")]
+
+    def loads(self, data):
+        return json.loads(bytes(data).decode("utf-8"))
+
+
+class MsgpackSerializer(Serializer):
+    """msgpack for plain data (if msgpack is installed).
+
+    Only encodes data that is restored exactly: lists, dictionaries (with
+    string, integer or bytes keys), bytes, strings, numbers (integers have to
+    fit into 64 bit), booleans and None.
+    """
+
+    name = "msgpack"
+
+    scalar_types = {type(None), bool, int, float, str, bytes}
+    key_types = {str, int, bytes}
+
+    def __init__(self):
+        self._available = None
+
+    def dumps(self, obj, version):
+        import msgpack
+
+        _check_plain(obj, self.scalar_types, self.key_types)
+        return [msgpack.packb(obj, use_bin_type=True)]
+
+    def is_available(self):
+        if self._available is None:
+            self._available = _module_available("msgpack")
+        return self._available
+
+    def loads(self, data):
+        import msgpack
+
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class NumpySerializer(Serializer):
+    """Raw numpy arrays: A small header describing dtype and shape followed by
+    the array's buffer, which is sent without copying if the array is
+    contiguous."""
+
+    name = "numpy"
+
+    # pad header so that the data is aligned
+    alignment = 16
+
+    def __init__(self):
+        self._available = None
+
+    def dumps(self, obj, version):
+        # if numpy was never imported, obj cannot be an array
+        np = sys.modules.get("numpy", None)
+        if np is None or type(obj) is not np.ndarray:
+            raise TypeError("Can only encode numpy arrays.")
+        if obj.dtype.hasobject or obj.dtype.fields is not None:
+            raise TypeError("Can only encode arrays of plain data types.")
+
+        if not obj.flags.c_contiguous:
+            obj = obj.copy(order="C")
+        header = json.dumps({"dtype": obj.dtype.str, "shape": obj.shape})
+        header_len = 4 + len(header)
+        header += " " * (-header_len % self.alignment)
+
+        return [
+            struct.pack("!I", len(header)) + header.encode("utf-8"),
+            memoryview(obj.reshape(-1).view(np.uint8)),
+        ]
+
+    def is_available(self):
+        if self._available is None:
+            self._available = _module_available("numpy")
+        return self._available
+
+    def loads(self, data):
+        import numpy as np
+
+        (header_len,) = struct.unpack_from("!I", data)
+        header = json.loads(bytes(data[4 : 4 + header_len]).decode("utf-8"))
+
+        array = np.frombuffer(
+            data, dtype=np.dtype(header["dtype"]), offset=4 + header_len
+        )
+        return array.reshape(header["shape"])
+
+
+class Placeholder(object):
+    "Stands in for an argument that is sent separately (see `split_arguments`)."
+
+
+class PickleSerializer(Serializer):
+    "Pickle, the version is the pickle protocol."
+
+    name = "pickle"
+    version = pkl.HIGHEST_PROTOCOL
+
+    def dumps(self, obj, version):
+        return [pkl.dumps(obj, protocol=version)]
+
+    def loads(self, data):
+        return pkl.loads(data)
+
+
+for _serializer in [
+    PickleSerializer(),
+    JsonSerializer(),
+    MsgpackSerializer(),
+    NumpySerializer(),
+]:
+    register_serializer(_serializer)
+
+set_type_serializer("numpy.ndarray", "numpy")
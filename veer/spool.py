@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Filesystem spool for executing veerified functions on any node that shares
+the spool directory.
+
+Layout of the spool directory:
+* `tmp/`: files being written (moved atomically into place once complete)
+* `pending/<job_id>.job`: jobs waiting for a consumer
+* `claimed/<job_id>.job`: jobs being executed, the modification time is the
+  consumer's heartbeat
+* `done/<job_id>.result`: results waiting for the host
+* `cancelled/<job_id>`: markers for jobs whose result is not needed anymore
+
+Consumers are started via `python -m veer.spool consume <spool_dir>`.
+"""
+
+__all__ = [
+    "Spool",
+    "consume",
+    "get_spool_dir",
+]
+
+import argparse
+import importlib
+import logging
+import os
+import os.path as osp
+import pickle as pkl
+import socket as skt
+import sys
+import threading
+import time
+import uuid
+
+from .config import get_config
+from .exception import RemoteError
+
+log = logging.getLogger(__name__)
+
+
+def consume(directory, max_jobs=None, idle_timeout=None):
+    """Execute jobs from the spool directory until stopped.
+
+    Args:
+        directory: Spool directory to take jobs from.
+
+        max_jobs: Stop after executing this many jobs (None: no limit).
+
+        idle_timeout: Stop after not finding any job for this many seconds
+                      (None: wait forever).
+
+    Returns:
+        Number of executed jobs.
+    """
+    queue = Spool(directory)
+    log.info(f"Consuming jobs from {queue.directory}.")
+
+    num_jobs = 0
+    last_job = time.monotonic()
+    while max_jobs is None or num_jobs < max_jobs:
+        queue.requeue_expired()
+
+        claimed = queue.claim()
+        if claimed is None:
+            if idle_timeout is not None and time.monotonic() - last_job > idle_timeout:
+                break
+            time.sleep(queue.poll_interval)
+            continue
+
+        job_id, job = claimed
+        if isinstance(job, RemoteError):
+            # the job could not be loaded
+            result = job
+        else:
+            heartbeat = _Heartbeat(queue, job_id)
+            heartbeat.start()
+            try:
+                result = _execute_job(job)
+            finally:
+                heartbeat.stop()
+        queue.complete(job_id, result)
+
+        num_jobs += 1
+        last_job = time.monotonic()
+
+    log.info(f"Executed {num_jobs} jobs, exiting.")
+    return num_jobs
+
+
+def get_spool_dir():
+    """Get the spool directory from config (`spool.directory` or
+    VEER_SPOOL_DIR)."""
+    directory = get_config("spool.directory")
+    if directory is None:
+        raise IOError("No spool directory specified!")
+    return directory
+
+
+def _execute_job(job):
+    # same as the regular child: make the module importable and run the
+    # function via the veerified object
+    try:
+        if job["func_dir"] not in sys.path:
+            sys.path.append(job["func_dir"])
+        module = importlib.import_module(job["module"])
+        veerified = getattr(module, job["function"])
+        # arguments may be instances of classes defined next to the function
+        args, kwargs = pkl.loads(job["arguments"])
+        return veerified._execute(args, kwargs)
+    except KeyboardInterrupt:
+        raise
+    except BaseException:
+        # report to the host instead of crashing the consumer (which would make
+        # the job crash the next consumer once its lease expires)
+        return _wrap_exception()
+
+
+def _wrap_exception():
+    wrapped = RemoteError()
+    wrapped.wrap_exception()
+    return wrapped
+
+
+class Spool(object):
+    """Job directory shared by hosts submitting calls and consumers executing
+    them. All state transitions are atomic renames so that any number of hosts
+    and consumers (on different nodes) can operate on it concurrently.
+
+    Job files are named `<job id>.<number of claims>.job` so that each claim of
+    a job has its own file in `claimed/`, which identifies the claim.
+    """
+
+    def __init__(self, directory, lease=None, poll_interval=None, max_attempts=None):
+        """
+        Args:
+            directory: Path of the spool directory (created if missing).
+
+            lease: Seconds after which claimed jobs without heartbeat are put
+                   back into the queue. If None, `spool.lease` is used.
+
+            poll_interval: Seconds between checks for jobs/results. If None,
+                           `spool.poll_interval` is used.
+
+            max_attempts: Number of claims after which a job whose consumers
+                          keep vanishing fails with a RemoteError. If None,
+                          `spool.max_attempts` is used.
+        """
+        self.directory = osp.abspath(osp.expanduser(directory))
+        self.lease = lease if lease is not None else get_config("spool.lease")
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else get_config("spool.poll_interval")
+        )
+        self.max_attempts = int(
+            max_attempts
+            if max_attempts is not None
+            else get_config("spool.max_attempts")
+        )
+        # maps ids of jobs claimed via this instance to their claimed files
+        self._claims = {}
+
+        for subdir in ["tmp", "pending", "claimed", "done", "cancelled"]:
+            os.makedirs(osp.join(self.directory, subdir), exist_ok=True)
+
+    def cancel(self, job_id):
+        """Withdraw a job: Remove it if it is still pending, otherwise mark it
+        so that its result is discarded."""
+        for filename in os.listdir(self._path("pending")):
+            if filename.startswith(f"{job_id}."):
+                try:
+                    os.remove(self._path("pending", filename))
+                    return
+                except FileNotFoundError:
+                    pass
+
+        with open(self._path("cancelled", job_id), "w"):
+            pass
+        # the result might have been written in the meantime
+        self._discard_result(job_id)
+
+    def claim(self):
+        """Claim the oldest pending job.
+
+        Returns:
+            Tuple of job id and job (RemoteError if the job cannot be loaded)
+            or None if there is no pending job.
+        """
+        for filename in sorted(os.listdir(self._path("pending"))):
+            job_id, attempts, _ = filename.split(".")
+            attempts = int(attempts) + 1
+            pending = self._path("pending", filename)
+            claimed = self._path("claimed", f"{job_id}.{attempts}.job")
+            try:
+                # the modification time is the start of the lease (set prior to
+                # claiming so that the job is never claimed with an old time)
+                os.utime(pending)
+                # only one consumer can succeed in renaming the file
+                os.rename(pending, claimed)
+            except FileNotFoundError:
+                continue
+
+            if osp.exists(self._path("cancelled", job_id)):
+                self._remove_silently(claimed)
+                self._remove_silently(self._path("cancelled", job_id))
+                continue
+
+            self._claims[job_id] = claimed
+            try:
+                if attempts > self.max_attempts:
+                    raise RuntimeError(
+                        f"Job {job_id} was claimed {attempts} times without "
+                        "completing, giving up."
+                    )
+                with open(claimed, "rb") as f:
+                    job = pkl.load(f)
+            except Exception:
+                log.error(f"Could not load job {job_id}.")
+                job = _wrap_exception()
+            log.debug(f"Claimed job {job_id} (attempt {attempts}).")
+            return job_id, job
+        return None
+
+    def complete(self, job_id, result):
+        """Store the result of a job claimed via this instance and release the
+        claim.
+
+        If the result cannot be stored (e.g., it cannot be pickled), a
+        RemoteError describing the failure is stored instead so that the host
+        does not wait forever and the job is not requeued. If the claim expired
+        in the meantime (and the job was requeued), the result is discarded.
+        """
+        claimed = self._claims.pop(job_id)
+        filename = f"{job_id}.result"
+        try:
+            tmp_path = self._write_tmp(filename, result)
+        except Exception:
+            log.error(f"Could not store result of job {job_id}.")
+            tmp_path = self._write_tmp(filename, _wrap_exception())
+
+        try:
+            # only the holder of the claim can remove its file
+            os.remove(claimed)
+        except FileNotFoundError:
+            log.warning(f"Lease of job {job_id} expired, discarding result.")
+            self._remove_silently(tmp_path)
+            return
+        os.rename(tmp_path, self._path("done", filename))
+
+        if osp.exists(self._path("cancelled", job_id)):
+            self._discard_result(job_id)
+
+    def get_result(self, job_id):
+        """Get (and remove) the result of a job.
+
+        Raises:
+            FileNotFoundError if the result is not available (yet).
+        """
+        path = self._path("done", f"{job_id}.result")
+        with open(path, "rb") as f:
+            result = pkl.load(f)
+        os.remove(path)
+        return result
+
+    def renew(self, job_id):
+        """Renew the lease of a claimed job."""
+        try:
+            os.utime(self._claims[job_id])
+        except FileNotFoundError:
+            log.warning(f"Lease of job {job_id} expired before it finished.")
+
+    def requeue_expired(self):
+        """Put claimed jobs whose lease expired (e.g., because their consumer
+        crashed) back into the queue.
+
+        Returns:
+            Number of requeued jobs.
+        """
+        num_requeued = 0
+        now = time.time()
+        for filename in os.listdir(self._path("claimed")):
+            path = self._path("claimed", filename)
+            try:
+                if now - os.stat(path).st_mtime < self.lease:
+                    continue
+                os.rename(path, self._path("pending", filename))
+            except FileNotFoundError:
+                # completed or requeued by someone else in the meantime
+                continue
+            log.warning(f"Lease of {filename} expired, requeued.")
+            num_requeued += 1
+        return num_requeued
+
+    def submit(self, job):
+        """Submit a job.
+
+        Args:
+            job: Dictionary describing the job (picklable).
+
+        Returns:
+            String describing the id of the submitted job.
+        """
+        # ids sort by submission time so that jobs are claimed in FIFO order
+        job_id = f"{time.time_ns():020d}-{uuid.uuid4().hex}"
+        tmp_path = self._write_tmp(f"{job_id}.job", job)
+        os.rename(tmp_path, self._path("pending", f"{job_id}.0.job"))
+        log.debug(f"Submitted job {job_id}.")
+        return job_id
+
+    def _discard_result(self, job_id):
+        try:
+            os.remove(self._path("done", f"{job_id}.result"))
+        except FileNotFoundError:
+            return
+        self._remove_silently(self._path("cancelled", job_id))
+
+    def _path(self, *parts):
+        return osp.join(self.directory, *parts)
+
+    def _remove_silently(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _write_tmp(self, filename, obj):
+        """Write `obj` to the tmp directory, from where it can be moved into
+        place atomically.
+
+        Returns:
+            Path of the written file.
+        """
+        tmp_path = self._path("tmp", f"{skt.gethostname()}-{os.getpid()}-{filename}")
+        try:
+            with open(tmp_path, "wb") as f:
+                pkl.dump(obj, f, protocol=pkl.DEFAULT_PROTOCOL)
+        except BaseException:
+            self._remove_silently(tmp_path)
+            raise
+        return tmp_path
+
+
+class _Heartbeat(object):
+    """Periodically renews the lease of a job while it is being executed."""
+
+    def __init__(self, queue, job_id):
+        self._queue = queue
+        self._job_id = job_id
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self._queue.lease / 3):
+            self._queue.renew(self._job_id)
+
+
+def main(argv=None):
+    from .logcfg import setup_logger
+
+    parser = argparse.ArgumentParser(prog="python -m veer.spool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_consume = subparsers.add_parser(
+        "consume", help="Execute jobs from a spool directory."
+    )
+    parser_consume.add_argument("directory", help="Spool directory.")
+    parser_consume.add_argument(
+        "--max-jobs", type=int, default=None, help="Exit after this many jobs."
+    )
+    parser_consume.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=None,
+        help="Exit after not finding any job for this many seconds.",
+    )
+
+    args = parser.parse_args(argv)
+    setup_logger()
+
+    if args.command == "consume":
+        consume(args.directory, max_jobs=args.max_jobs, idle_timeout=args.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
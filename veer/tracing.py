@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Opt-in tracing of host and child activity in Chrome trace-event format
+(which can be opened in Perfetto or chrome://tracing).
+
+Tracing is enabled by setting `tracing.file` (or VEER_TRACE) to the file the
+trace is written to when the host exits, or via `enable`. Children of a
+tracing host record spans as well and send them to the host after each call.
+Their timestamps are converted to the host's clock by an NTP-style estimate of
+the clock offset, based on the trace context sent before the arguments and the
+spans sent after the return value.
+"""
+
+__all__ = [
+    "Span",
+    "add_child_report",
+    "disable",
+    "enable",
+    "enabled",
+    "estimate_offset",
+    "get_child_report",
+    "get_events",
+    "now_us",
+    "record_startup",
+    "span",
+    "write",
+]
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+from .config import get_config
+
+log = logging.getLogger(__name__)
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def add_child_report(report, host_send, name):
+    """Add the events a child recorded during a call (host only).
+
+    Args:
+        report: Report sent by the child (see `get_child_report`).
+
+        host_send: Host time (in microseconds) the trace context was sent.
+
+        name: Name shown for the child in the trace.
+    """
+    if _tracer is None:
+        return
+    offset = estimate_offset(host_send, report["received"], report["sent"], now_us())
+    events = report["events"]
+    for event in events:
+        event["ts"] -= offset
+    _tracer.add_process_name(report["pid"], name)
+    _tracer.add_events(events)
+
+
+def disable():
+    """Disable tracing in this process and discard all recorded events
+    (children spawned before keep recording)."""
+    global _tracer
+    with _tracer_lock:
+        _tracer = None
+
+
+def enable(path=None):
+    """Enable tracing in this process.
+
+    Args:
+        path: File the trace is written to when the process exits (None: only
+              record events, e.g., in children or to call `write` manually).
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = _Tracer()
+            if "VEER_PARENT" not in os.environ:
+                _tracer.add_process_name(os.getpid(), "veer host")
+            if path is not None:
+                atexit.register(write, path)
+                log.info(f"Tracing enabled, writing trace to {path} on exit.")
+
+
+def enabled():
+    """Check if tracing is enabled."""
+    return _tracer is not None
+
+
+def estimate_offset(host_send, child_recv, child_send, host_recv):
+    """Estimate the offset of the child's clock relative to the host's clock
+    from a round trip (all times in microseconds).
+
+    Args:
+        host_send: Host time the trace context was sent.
+
+        child_recv: Child time the trace context was received.
+
+        child_send: Child time the child's events were sent.
+
+        host_recv: Host time the child's events were received.
+
+    Returns:
+        Offset in microseconds (child time - offset = host time).
+    """
+    return ((child_recv - host_send) + (child_send - host_recv)) / 2
+
+
+def get_child_report(context):
+    """Collect the events recorded by a child since the last report (child
+    only).
+
+    Args:
+        context: Trace context received from the host, including the child
+                 time it was `received` at.
+
+    Returns:
+        Dictionary of the child's `pid`, its `events` and the child times the
+        context was `received` and the report `sent` at.
+    """
+    events = _tracer.pop_events() if _tracer is not None else []
+    for event in events:
+        event.setdefault("args", {})["call_id"] = context["call_id"]
+    return {
+        "pid": os.getpid(),
+        "events": events,
+        "received": context["received"],
+        "sent": now_us(),
+    }
+
+
+def get_events():
+    """Get a copy of all recorded events."""
+    if _tracer is None:
+        return []
+    return _tracer.get_events()
+
+
+def now_us():
+    """Current time of the trace clock in microseconds."""
+    return time.monotonic_ns() / 1000
+
+
+def record_startup():
+    """Record the time from the start of the child script (VEER_TRACE_START,
+    set by the script) until now as `import` span (child only)."""
+    if _tracer is None or "VEER_TRACE_START" not in os.environ:
+        return
+    start = int(os.environ.pop("VEER_TRACE_START")) / 1000
+    _tracer.add_events(
+        [
+            {
+                "name": "import",
+                "cat": "child",
+                "ph": "X",
+                "ts": start,
+                "dur": now_us() - start,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            }
+        ]
+    )
+
+
+def span(name, category="host", **args):
+    """Context manager recording a span (no-op if tracing is disabled).
+
+    Args:
+        name: Name of the span.
+
+        category: Category of the span (e.g., `host` or `child`).
+
+        args: Further information shown with the span (e.g., `call_id`).
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def write(path):
+    """Write all recorded events as Chrome trace-event JSON to `path`."""
+    with open(path, "w") as f:
+        json.dump({"traceEvents": get_events(), "displayTimeUnit": "ms"}, f)
+    log.info(f"Wrote trace to {path}.")
+
+
+class Span(object):
+    "Span that is recorded when the context is exited."
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = now_us()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event = {
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": self.start,
+            "dur": now_us() - self.start,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        if len(self.args) > 0:
+            event["args"] = self.args
+        if _tracer is not None:
+            _tracer.add_events([event])
+
+
+class _Tracer(object):
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._named = set()
+
+    def add_events(self, events):
+        with self._lock:
+            self._events.extend(events)
+
+    def add_process_name(self, pid, name):
+        with self._lock:
+            if pid in self._named:
+                return
+            self._named.add(pid)
+            self._events.append(
+                {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}}
+            )
+
+    def get_events(self):
+        with self._lock:
+            return list(self._events)
+
+    def pop_events(self):
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+
+if "VEER_PARENT" in os.environ:
+    if "VEER_TRACE" in os.environ:
+        # children only record and send their events to the host
+        enable()
+elif get_config("tracing.file") is not None:
+    enable(get_config("tracing.file"))
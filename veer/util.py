@@ -3,7 +3,9 @@
 
 __all__ = [
     "delete_script_file",
+    "get_rss",
     "in_child",
+    "kill_process_tree",
     "recursive_update_dict",
     "recv_object",
     "send_object",
@@ -11,7 +13,10 @@ __all__ = [
 
 import logging
 import os
-import pickle as pkl
+import signal
+import sys
+
+from . import metrics, serialization
 
 
 log = logging.getLogger(__name__)
@@ -42,6 +47,19 @@ def delete_script_file(script_filename, warn=False):
             raise e
 
 
+def get_rss():
+    """Get the resident set size of the current process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # no procfs: fall back to the peak resident set size
+        import resource
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
 def in_child():
     """Check if we are in a veer-child
 
@@ -51,6 +69,21 @@ def in_child():
     return "VEER_PARENT" in os.environ
 
 
+def kill_process_tree(process):
+    """Kill a process and all its descendants.
+
+    Args:
+        process: subprocess.Popen-instance that was started in its own session
+                 (i.e., it is the leader of its process group).
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # the whole process group already exited
+        pass
+    process.wait()
+
+
 def recursive_update_dict(merge_into, merge_from):
     """
     Recursively merge one dictionary into another.
@@ -84,52 +117,98 @@ def recursive_update_dict(merge_into, merge_from):
             merge_into[k] = v
 
 
-def recv_object(socket, buflen=4096):
+def recv_object(socket, buflen=4096, stats=None):
+    """Receive an object sent via `send_object`.
+
+    Args:
+        socket: Socket to receive from.
+
+        buflen: Maximum length of the header.
+
+        stats: If given, collections.Counter in which the number of received
+               bytes (`bytes_received`) and the number of objects received via
+               each serializer (`received_serializer_<name>`) is accumulated.
+
+    Returns:
+        The received object.
+    """
+    header = socket.recv(buflen)
+    if not header:
+        raise RuntimeError("Socket connection lost.")
     try:
-        obj_len = int(socket.recv(buflen).decode(coding))
+        serializer, obj_len = header.decode(coding).split(" ")
+        obj_len = int(obj_len)
     except ValueError:
         msg = "Remote computation failed. " "See log further up for details."
         log.error(msg)
         raise IOError(msg)
     sync_after_recv(socket)
 
+    # receive into a preallocated (writable) buffer to avoid copies
+    data = bytearray(obj_len)
+    view = memoryview(data)
     recv_counter = 0
-    chunks = []
     while recv_counter < obj_len:
-        chunk = socket.recv(buflen)
-        if chunk == "":
+        chunk_size = socket.recv_into(view[recv_counter:])
+        if chunk_size == 0:
             raise RuntimeError("Socket connection lost.")
 
-        recv_counter += len(chunk)
-        chunks.append(chunk)
+        recv_counter += chunk_size
 
-    obj = pkl.loads(b"".join(chunks))
+    obj = serialization.loads(serializer, data)
     sync_after_recv(socket)
 
+    metrics.bytes_received.inc(obj_len)
+    if stats is not None:
+        stats["bytes_received"] += obj_len
+        stats[f"received_serializer_{serializer}"] += 1
+
     return obj
 
 
-def send_object(socket, obj, buflen=4096):
-    "send object as pickle over a socket"
-    obj_str = pkl.dumps(obj, protocol=-1)
-    # first, send the length
-    obj_len = len(obj_str)
-    if log.getEffectiveLevel() <= logging.DEBUG:
-        log.debug(f"Object length: {obj_len}")
-    socket.send(str(obj_len).encode(coding))
+def send_object(socket, obj, buflen=4096, serializers=None, preferred=None, stats=None):
+    """Send object over a socket.
 
-    sync_after_send(socket)
+    Args:
+        socket: Socket to send to.
 
-    send_counter = 0
-    while send_counter < obj_len:
-        chunk_size = socket.send(obj_str[send_counter:])
+        obj: Object to send.
 
-        if chunk_size == 0:
-            raise RuntimeError("Socket connection lost.")
+        buflen: Unused, kept for compatibility.
+
+        serializers: Dictionary of serializers supported by both sides (see
+                     `serialization.negotiate`). If None, all locally available
+                     serializers may be used.
 
-        send_counter += chunk_size
+        preferred: Name of the serializer to try first (see
+                   `serialization.dumps`).
+
+        stats: If given, collections.Counter in which the number of sent bytes
+               (`bytes_sent`) and the number of objects sent via each serializer
+               (`serializer_<name>`) is accumulated.
+    """
+    name, buffers = serialization.dumps(
+        obj, negotiated=serializers, preferred=preferred
+    )
+    buffers = [memoryview(buffer) for buffer in buffers]
+
+    # first, send serializer and length
+    obj_len = sum(buffer.nbytes for buffer in buffers)
+    if log.getEffectiveLevel() <= logging.DEBUG:
+        log.debug(f"Object length: {obj_len} (serializer: {name})")
+    socket.send(f"{name} {obj_len}".encode(coding))
+
+    sync_after_send(socket)
+
+    for buffer in buffers:
+        socket.sendall(buffer)
     sync_after_send(socket)
 
+    metrics.bytes_sent.inc(obj_len)
+    if stats is not None:
+        stats["bytes_sent"] += obj_len
+        stats[f"serializer_{name}"] += 1
+
 
 def sync_after_recv(socket):
     """Perform a sync after we received data via socket."""
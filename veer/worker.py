@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Pools of long-lived children that execute one call after another.
+
+Children are replaced ("recycled") once they exceed the configured number of
+calls, resident set size or age. Retired children are only ever idle, so no
+call fails because of recycling, and their replacement is spawned right away
+(or, if the limit is foreseeable, already while the last call is running).
+
+Each child holds a scheduler slot while it lives. If other functions wait for a
+slot (see `scheduler.max_children`), idle children are retired instead of being
+kept.
+"""
+
+__all__ = [
+    "WorkerPool",
+]
+
+import collections
+import logging
+import threading
+import time
+
+from . import metrics, util
+from .config import get_config
+from .exception import RemoteTimeoutError
+from .scheduler import get_scheduler
+
+log = logging.getLogger(__name__)
+
+
+class WorkerPool(object):
+    """Long-lived children of a single veerified function."""
+
+    def __init__(
+        self, veerified, size, max_calls_per_child=None, max_rss=None, max_age=None
+    ):
+        """
+        Args:
+            veerified: Veerify-instance whose calls are executed.
+
+            size: Maximum number of children (excluding replacements that are
+                  being started while the child they replace is still busy).
+
+            max_calls_per_child: Replace children after this many calls. If
+                                 None, `workers.max_calls_per_child` is used.
+
+            max_rss: Replace children whose resident set size exceeds this many
+                     bytes after a call. If None, `workers.max_rss` is used.
+
+            max_age: Replace children that are older than this many seconds. If
+                     None, `workers.max_age` is used.
+        """
+        if size < 1:
+            raise ValueError("Worker pools need at least one child.")
+
+        self._veerified = veerified
+        self.name = veerified._qualified_name
+        self.size = size
+        self.max_calls_per_child = _from_config(
+            max_calls_per_child, "workers.max_calls_per_child"
+        )
+        self.max_rss = _from_config(max_rss, "workers.max_rss")
+        self.max_age = _from_config(max_age, "workers.max_age")
+
+        self._closed = False
+        self._cond = threading.Condition()
+        self._idle = collections.deque()
+        # children that are alive or being started
+        self._num_children = 0
+        # children whose replacement has been started already
+        self._replaced = set()
+
+        get_scheduler().add_reclaimer(self)
+
+    def acquire(self, timeout=None):
+        """Get an idle child (spawning one if the pool is not full).
+
+        Args:
+            timeout: Maximum time in seconds to wait for a child (None: wait
+                     forever).
+
+        Returns:
+            The child, which has to be handed back via `release`.
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Worker pool was closed.")
+
+                while len(self._idle) > 0:
+                    child = self._idle.popleft()
+                    reason = self._get_recycle_reason(child)
+                    if reason is not None:
+                        self._recycle(child, reason)
+                        continue
+
+                    if (
+                        self.max_calls_per_child is not None
+                        and child.calls + 1 >= self.max_calls_per_child
+                    ):
+                        # last call of this child: start the replacement now so
+                        # that it is ready once this call finishes
+                        self._replaced.add(child)
+                        self._spawn_async()
+                    return child
+
+                if self._num_children < self.size:
+                    self._num_children += 1
+                    break
+
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RemoteTimeoutError(
+                            f"No child of {self._veerified._qualified_name} became "
+                            f"available within {timeout}s."
+                        )
+                self._cond.wait(remaining)
+
+        try:
+            return self._start_child(deadline)
+        except BaseException:
+            self._discard()
+            raise
+
+    def close(self):
+        """Retire all idle children; busy children are retired once they are
+        released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), collections.deque()
+            self._cond.notify_all()
+
+        for child in idle:
+            self._retire(child)
+
+    def get_num_children(self):
+        """Get the number of children that are alive or being started."""
+        with self._cond:
+            return self._num_children
+
+    def reclaim(self):
+        """Retire an idle child so that its scheduler slot becomes available.
+
+        Returns:
+            True if a child was retired, False if there was no idle child.
+        """
+        with self._cond:
+            if len(self._idle) == 0:
+                return False
+            child = self._idle.popleft()
+            self._replaced.discard(child)
+        log.debug(f"Retiring idle child {child.process.pid} of {self.name}.")
+        threading.Thread(target=self._retire, args=(child,), daemon=True).start()
+        return True
+
+    def release(self, child, healthy=True):
+        """Hand back a child after a call.
+
+        Args:
+            child: Child obtained via `acquire`.
+
+            healthy: If False (e.g., the call timed out or the connection
+                     broke), the child is killed instead of being reused.
+        """
+        if not healthy:
+            child.release()
+            with self._cond:
+                self._replaced.discard(child)
+                self._discard()
+            return
+
+        contended = get_scheduler().is_contended(self.name)
+        with self._cond:
+            if not self._closed and not contended:
+                reason = self._get_recycle_reason(child)
+                if reason is not None:
+                    self._recycle(child, reason)
+                else:
+                    self._idle.append(child)
+                    self._cond.notify()
+                return
+            self._replaced.discard(child)
+
+        if contended:
+            # other functions wait for the slot this child holds
+            log.debug(f"Retiring child {child.process.pid} of {self.name}.")
+        self._retire(child)
+
+    def _discard(self):
+        # self._cond is reentrant, so this may be called with it held
+        with self._cond:
+            self._num_children -= 1
+            self._cond.notify()
+
+    def _get_recycle_reason(self, child):
+        """Get a description of the policy that requires `child` to be replaced
+        or None if it can be reused."""
+        if self.max_calls_per_child is not None:
+            if child.calls >= self.max_calls_per_child:
+                return f"max_calls_per_child ({child.calls} calls)"
+
+        if self.max_rss is not None and child.rss is not None:
+            if child.rss > self.max_rss:
+                return f"max_rss ({child.rss} > {self.max_rss} bytes)"
+
+        if self.max_age is not None:
+            age = time.monotonic() - child.started
+            if age >= self.max_age:
+                return f"max_age ({age:.1f}s > {self.max_age}s)"
+
+        return None
+
+    def _recycle(self, child, reason):
+        """Replace an idle child (called with self._cond held)."""
+        name = self._veerified._qualified_name
+        log.info(f"Recycling child {child.process.pid} of {name}: {reason}")
+
+        policy = reason.split(" ")[0]
+        metrics.children_recycled.inc(function=name, policy=policy)
+        with self._veerified._stats_lock:
+            self._veerified._stats["recycles"] += 1
+
+        if child in self._replaced:
+            self._replaced.discard(child)
+        else:
+            self._spawn_async()
+        threading.Thread(target=self._retire, args=(child,), daemon=True).start()
+
+    def _retire(self, child):
+        """Ask an idle child to exit and free its resources."""
+        try:
+            util.send_object(child.conn, None, serializers=child.serializers)
+            child.process.wait(timeout=get_config("workers.shutdown_timeout"))
+        except Exception as e:
+            log.warning(f"Child {child.process.pid} did not exit gracefully: {e}")
+        child.release()
+        self._discard()
+
+    def _spawn_async(self):
+        """Start a child in the background (called with self._cond held)."""
+        self._num_children += 1
+
+        def spawn():
+            try:
+                child = self._start_child()
+            except Exception:
+                log.exception(
+                    f"Could not start child of {self._veerified._qualified_name}."
+                )
+                self._discard()
+                return
+
+            with self._cond:
+                if not self._closed:
+                    self._idle.append(child)
+                    self._cond.notify()
+                    return
+            self._retire(child)
+
+        threading.Thread(target=spawn, daemon=True).start()
+
+    def _start_child(self, deadline=None):
+        return self._veerified._start_child(deadline=deadline, persistent=True)
+
+
+def _from_config(value, key):
+    if value is not None:
+        return value
+    return get_config(key)